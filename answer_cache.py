@@ -0,0 +1,177 @@
+"""Two-tier cache for Gemini answers about images.
+
+Answers are keyed by a hash of the image content, a normalized question and
+the model settings. Recent answers live in an in-memory LRU; every answer is
+also written to a small JSON file on disk so it survives restarts. The disk
+tier keeps at most `max_files` answers: beyond that, the least recently used
+files (oldest modification time; disk hits refresh it) are deleted. Delete
+the directory to clear the cache by hand.
+
+With `match_similar=True` the cache also stores a perceptual hash (dHash) of
+each image, so a re-saved or slightly resized copy of a known image reuses
+the answers already given for the original.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from PIL import Image
+
+import metrics
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case the question and collapse whitespace and trailing punctuation."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!").lower()
+
+
+def perceptual_hash(image_path: str, size: int = 8) -> int:
+    """Return a 64-bit difference hash that survives resizing and re-encoding."""
+    with Image.open(image_path) as img:
+        img.draft("L", (size * 4, size * 4))
+        small = img.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+        pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+class AnswerCache:
+    """Memory LRU in front of a directory of JSON answers."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_items: int = 256,
+        max_files: int = 10_000,
+        match_similar: bool = False,
+        max_distance: int = 4,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_items = max_items
+        self.max_files = max_files
+        self.match_similar = match_similar
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._phashes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._index_path = self.directory / "phashes.jsonl"
+        self._file_count = sum(1 for _ in self._answer_files())
+        if match_similar and self._index_path.exists():
+            for line in self._index_path.read_text(encoding="utf-8").splitlines():
+                entry = json.loads(line)
+                self._phashes[entry["image"]] = entry["phash"]
+
+    def image_id(self, image_path: str, content_hash: str) -> str:
+        """Return the id answers are stored under for this image.
+
+        Without similarity matching this is the content hash. With it, an
+        image whose perceptual hash is close to a known image borrows that
+        image's id.
+        """
+        if not self.match_similar:
+            return content_hash
+        with self._lock:
+            if content_hash in self._phashes:
+                return content_hash
+        phash = perceptual_hash(image_path)
+        with self._lock:
+            for known, known_phash in self._phashes.items():
+                if bin(phash ^ known_phash).count("1") <= self.max_distance:
+                    return known
+            self._phashes[content_hash] = phash
+            with self._index_path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps({"image": content_hash, "phash": phash}) + "\n")
+        return content_hash
+
+    @staticmethod
+    def key(image_id: str, question: str, settings: str) -> str:
+        """Combine image, normalized question and model settings into one key."""
+        raw = "\n".join([image_id, normalize_question(question), settings])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached answer or None, promoting disk hits into memory."""
+        with self._lock:
+            answer = self._memory.get(key)
+            if answer is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                metrics.CACHE_LOOKUPS.inc(cache=self.directory.name, result="memory_hit")
+                return answer
+        path = self.directory / f"{key}.json"
+        if not path.exists():
+            with self._lock:
+                self.misses += 1
+            metrics.CACHE_LOOKUPS.inc(cache=self.directory.name, result="miss")
+            return None
+        try:
+            answer = json.loads(path.read_text(encoding="utf-8"))["answer"]
+            # Mark the file as recently used, so eviction keeps it.
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process between the check and the read.
+            with self._lock:
+                self.misses += 1
+            metrics.CACHE_LOOKUPS.inc(cache=self.directory.name, result="miss")
+            return None
+        with self._lock:
+            self.hits += 1
+            self._remember(key, answer)
+        metrics.CACHE_LOOKUPS.inc(cache=self.directory.name, result="disk_hit")
+        return answer
+
+    def put(self, key: str, answer: str) -> None:
+        """Store an answer in both tiers."""
+        path = self.directory / f"{key}.json"
+        is_new = not path.exists()
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"answer": answer}), encoding="utf-8")
+        tmp_path.replace(path)
+        with self._lock:
+            self._remember(key, answer)
+            self._file_count += is_new
+            over_limit = self._file_count > self.max_files
+        if over_limit:
+            self._evict()
+
+    def _answer_files(self) -> Iterator[Path]:
+        return self.directory.glob("*.json")
+
+    def _evict(self) -> None:
+        """Delete the least recently used files, down to 90% of max_files.
+
+        Going below the limit means the directory is listed once per many
+        new answers, not on every put.
+        """
+        files = []
+        for path in self._answer_files():
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        files.sort()
+        excess = len(files) - int(self.max_files * 0.9)
+        for _, path in files[: max(0, excess)]:
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._file_count = len(files) - max(0, excess)
+
+    def _remember(self, key: str, answer: str) -> None:
+        self._memory[key] = answer
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
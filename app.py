@@ -12,6 +12,12 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+import hedging
+import metrics
+import model_routing
+import rate_limits
+import tracing
+
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -20,23 +26,47 @@ if not api_key:
 client = genai.Client(api_key=api_key)
 
 MODEL_NAME = "gemini-2.0-flash"
+FALLBACK_MODELS = ["gemini-2.0-flash-lite"]
+FIRST_CHUNK_SLO_SECONDS = 3.0
+HEDGE_MAX_PROMPT_TOKENS = 200
+
+# Switches to the lighter model while MODEL_NAME is slow to start streaming or keeps failing.
+router = model_routing.ModelRouter(MODEL_NAME, FALLBACK_MODELS, latency_slo=FIRST_CHUNK_SLO_SECONDS)
+
+# Set GEMINI_HEDGING=1 to race a backup stream when the first chunk is slow.
+hedge_policy = hedging.HedgePolicy()
 
 
+@tracing.traced("app.generate")
 def generate(prompt: str) -> Iterator[str]:
     """Stream the Gemini response chunk by chunk."""
     if not prompt.strip():
         raise gr.Error("Please enter a prompt.")
 
+    def open_stream(model: str) -> Iterator[types.GenerateContentResponse]:
+        return rate_limits.stream(
+            model,
+            lambda: client.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config=types.GenerateContentConfig(temperature=0.7),
+            ),
+            tokens=rate_limits.estimate_tokens(prompt),
+        )
+
+    short_prompt = rate_limits.estimate_tokens(prompt) <= HEDGE_MAX_PROMPT_TOKENS
+    def traced_stream(model: str) -> Iterator[types.GenerateContentResponse]:
+        stream = hedge_policy.stream(lambda: open_stream(model)) if short_prompt else open_stream(model)
+        # Traced per model, so the span names the model that actually served the request.
+        return tracing.trace_stream(stream, "generate_content_stream", model=model)
+
+    stream = router.stream(traced_stream)
     chunks: List[str] = []
-    stream = client.models.generate_content_stream(
-        model=MODEL_NAME,
-        contents=prompt,
-        config=types.GenerateContentConfig(temperature=0.7),
-    )
-    for chunk in stream:
+    for served_by, chunk in stream:
         if chunk.text:
             chunks.append(chunk.text)
-            yield "".join(chunks)
+            metrics.STREAMED_BYTES.inc(len(chunk.text.encode("utf-8")), handler="app.generate")
+            yield "".join(chunks) + f"\n\n*Streaming from `{served_by}`.*"
 
 
 with gr.Blocks(title="Gemini Starter") as demo:
@@ -53,4 +83,5 @@ with gr.Blocks(title="Gemini Starter") as demo:
 
 
 if __name__ == "__main__":
+    metrics.serve_from_env()
     demo.launch()
@@ -0,0 +1,110 @@
+"""Render many Imagen prompts from a spreadsheet with the Step 12 logic.
+
+Usage:
+    uv run python batch_images.py prompts.csv --output-dir catalog_images
+
+The input is a CSV file with `prompt` and `aspect_ratio` columns (an optional
+`count` column asks for several candidates per row) or a JSONL file with the
+same keys. Each row runs through `generate_images` from Step 12 on a small
+worker pool, with at most `--rpm` Imagen requests per minute.
+
+Progress is appended to `manifest.jsonl` in the output folder after every
+row. Running the same command again skips the rows that already finished, so
+an interrupted job simply resumes.
+"""
+
+import argparse
+import csv
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List
+
+import gradio as gr
+
+import rate_limits
+from step12_gemini_image_generation import DEFAULT_ASPECT, IMAGE_MODEL, generate_images
+
+
+def read_rows(path: Path) -> List[Dict[str, str]]:
+    """Load prompt rows from a CSV or JSONL file."""
+    if path.suffix.lower() in {".jsonl", ".ndjson"}:
+        lines = path.read_text(encoding="utf-8").splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    with path.open(newline="", encoding="utf-8") as handle:
+        return list(csv.DictReader(handle))
+
+
+def load_finished(manifest_path: Path) -> Dict[int, dict]:
+    """Return the manifest entries of rows that already completed."""
+    finished: Dict[int, dict] = {}
+    if manifest_path.exists():
+        for line in manifest_path.read_text(encoding="utf-8").splitlines():
+            entry = json.loads(line)
+            if entry["status"] == "done":
+                finished[entry["row"]] = entry
+    return finished
+
+
+def render_row(index: int, row: Dict[str, str], output_dir: Path) -> dict:
+    """Run one row through Step 12 and copy its images into the output folder.
+
+    Any error is recorded as a failed row, so one bad row never stops the job.
+    """
+    prompt = str(row.get("prompt", "")).strip()
+    aspect_ratio = str(row.get("aspect_ratio") or DEFAULT_ASPECT).strip()
+    entry = {"row": index, "prompt": prompt, "aspect_ratio": aspect_ratio, "files": []}
+
+    gallery, status = [], ""
+    try:
+        count = int(row.get("count") or 1)
+        for gallery, status in generate_images(prompt, aspect_ratio, count, priority=rate_limits.BATCH):
+            pass
+        for number, (image_path, _) in enumerate(gallery, start=1):
+            source = Path(image_path)
+            target = output_dir / "images" / f"row{index:05d}-{number}{source.suffix}"
+            shutil.copyfile(source, target)
+            entry["files"].append(str(target.relative_to(output_dir)))
+    except Exception as err:  # recorded in the manifest; the other rows go on
+        message = str(err) if isinstance(err, gr.Error) else f"{type(err).__name__}: {err}"
+        entry.update(status="failed", message=message)
+        return entry
+    entry.update(status="done" if len(gallery) == count else "partial", message=status)
+    return entry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", type=Path, help="CSV or JSONL file with prompt rows")
+    parser.add_argument("--output-dir", type=Path, default=Path("batch_output"))
+    parser.add_argument("--workers", type=int, default=4, help="rows rendered at the same time")
+    parser.add_argument("--rpm", type=float, default=20, help="Imagen requests per minute")
+    args = parser.parse_args()
+
+    rows = read_rows(args.input)
+    (args.output_dir / "images").mkdir(parents=True, exist_ok=True)
+    manifest_path = args.output_dir / "manifest.jsonl"
+    finished = load_finished(manifest_path)
+    todo = [(index, row) for index, row in enumerate(rows) if index not in finished]
+    print(f"{len(rows)} rows, {len(finished)} already done, {len(todo)} to render.")
+
+    rate_limits.configure(IMAGE_MODEL, rpm=args.rpm)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool, manifest_path.open(
+        "a", encoding="utf-8"
+    ) as manifest:
+        futures = {
+            pool.submit(render_row, index, row, args.output_dir): index for index, row in todo
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                entry = future.result()
+            except Exception as err:  # keep writing the rows that still finish
+                entry = {"row": futures[future], "status": "failed", "message": f"{type(err).__name__}: {err}"}
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            print(f"[{done}/{len(todo)}] row {entry['row']}: {entry['status']}")
+
+
+if __name__ == "__main__":
+    main()
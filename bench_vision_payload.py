@@ -0,0 +1,59 @@
+"""Compare the old PNG re-encode with the Step 9 image handoff.
+
+Usage:
+    uv run python bench_vision_payload.py photo1.jpg photo2.png ...
+
+For every image the script reports how long it takes to build the payload
+and how many bytes would be sent to Gemini, first with the original
+"decode and save as PNG" approach and then with `prepare_image`.
+"""
+
+import io
+import os
+import sys
+import time
+from typing import Callable, Tuple
+
+from PIL import Image
+
+# Step 9 creates a Gemini client on import; no request is made here.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+from step09_gemini_vision import prepare_image  # noqa: E402
+
+
+def png_reencode(image_path: str) -> Tuple[bytes, str]:
+    """Reproduce the original Step 9 behaviour: decode, then save as PNG."""
+    with Image.open(image_path) as img:
+        buffer = io.BytesIO()
+        img.convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue(), "image/png"
+
+
+def measure(encode: Callable[[str], Tuple[bytes, str]], image_path: str, rounds: int = 3):
+    """Return the best encode time in milliseconds, the payload size and MIME type."""
+    best = float("inf")
+    payload, mime_type = b"", ""
+    for _ in range(rounds):
+        start = time.perf_counter()
+        payload, mime_type = encode(image_path)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(payload), mime_type
+
+
+def main(paths: list[str]) -> None:
+    if not paths:
+        raise SystemExit(__doc__)
+
+    print(f"{'image':30} {'before ms':>10} {'before KB':>10} {'after ms':>10} {'after KB':>10}  after type")
+    for image_path in paths:
+        old_ms, old_bytes, _ = measure(png_reencode, image_path)
+        new_ms, new_bytes, new_type = measure(prepare_image, image_path)
+        print(
+            f"{os.path.basename(image_path)[:30]:30} "
+            f"{old_ms:10.1f} {old_bytes / 1024:10.1f} "
+            f"{new_ms:10.1f} {new_bytes / 1024:10.1f}  {new_type}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
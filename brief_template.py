@@ -0,0 +1,116 @@
+"""The step15 campaign-brief prompt, written once as data.
+
+`render_prompt` turns the brief fields into the Veo prompt in Python, and
+`craft_js` compiles the same template into a Gradio `js` function so the
+"Craft prompt" button can build the prompt in the browser without a server
+round trip. Both read PROMPT_TEMPLATE, so the two versions cannot drift
+apart: change the wording here and both follow.
+
+Each line rule has `parts` joined with a space (empty parts are skipped), an
+optional `if` list (the line appears when any of those fields is non-empty)
+and an optional `else` text used when the condition fails.
+"""
+
+import json
+import re
+from typing import Any, Dict, List
+
+
+PROMPT_TEMPLATE: Dict[str, Any] = {
+    # Derived fields: the first non-empty source wins.
+    "first_of": {"objective": ["custom_goal", "campaign_goal"]},
+    "lines": [
+        {
+            "if": ["brand_name"],
+            "parts": ["Produce a {duration_seconds}-second marketing video for {brand_name}."],
+            "else": "Produce a {duration_seconds}-second marketing video.",
+        },
+        {"if": ["objective"], "parts": ["Campaign objective: {objective}."]},
+        {
+            "if": ["persona_title", "persona_details"],
+            "parts": ["Target viewer:", "{persona_title}", "{persona_details}"],
+        },
+        {"if": ["product_highlights"], "parts": ["Showcase these key messages or offers: {product_highlights}."]},
+        {"if": ["differentiators"], "parts": ["Brand differentiators to reinforce: {differentiators}."]},
+        {"if": ["brand_voice"], "parts": ["Maintain a brand voice that is {brand_voice}."]},
+        {"if": ["visual_style"], "parts": ["Visual direction and cinematography: {visual_style}."]},
+        {
+            "if": ["audio_direction"],
+            "parts": ["Audio direction (music, ambience, dialogue cues): {audio_direction}."],
+        },
+        {"if": ["call_to_action"], "parts": ["End with a clear call-to-action: {call_to_action}."]},
+        {"if": ["extra_notes"], "parts": ["Additional guidance: {extra_notes}."]},
+        {"parts": ["Include naturalistic motion and keep logos or on-screen text sharp and legible."]},
+        {"parts": ["Deliver a cohesive narrative arc that hooks the viewer in the opening seconds."]},
+    ],
+}
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def _clean(value: Any) -> str:
+    """Normalize a field the same way the browser version does."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def render_prompt(fields: Dict[str, Any]) -> str:
+    """Fill PROMPT_TEMPLATE with the brief fields and return the prompt."""
+    values = {name: _clean(value) for name, value in fields.items()}
+    for name, sources in PROMPT_TEMPLATE["first_of"].items():
+        values[name] = next((values[source] for source in sources if values.get(source)), "")
+
+    def fill(text: str) -> str:
+        return _PLACEHOLDER.sub(lambda match: values.get(match.group(1), ""), text)
+
+    lines = []
+    for rule in PROMPT_TEMPLATE["lines"]:
+        condition = rule.get("if")
+        if condition is None or any(values.get(name) for name in condition):
+            lines.append(" ".join(part for part in map(fill, rule["parts"]) if part))
+        elif "else" in rule:
+            lines.append(fill(rule["else"]))
+    return "\n".join(lines)
+
+
+_CRAFT_JS = r"""
+(...args) => {
+    const template = __TEMPLATE__;
+    const names = __NAMES__;
+    const clean = (value) =>
+        value === null || value === undefined ? "" : typeof value === "string" ? value.trim() : String(value);
+    const values = {};
+    names.forEach((name, index) => { values[name] = clean(args[index]); });
+    for (const [name, sources] of Object.entries(template.first_of)) {
+        values[name] = sources.map((source) => values[source]).find((value) => value) || "";
+    }
+    const fill = (text) => text.replace(/\{(\w+)\}/g, (_, name) => values[name] || "");
+    const lines = [];
+    for (const rule of template.lines) {
+        if (!rule.if || rule.if.some((name) => values[name])) {
+            lines.push(rule.parts.map(fill).filter((part) => part).join(" "));
+        } else if (rule.else !== undefined) {
+            lines.push(fill(rule.else));
+        }
+    }
+    return [lines.join("\n"), values.negative_prompt || __DEFAULT_NEGATIVE__];
+}
+"""
+
+
+def craft_js(input_names: List[str], default_negative: str) -> str:
+    """Return a Gradio `js` function producing (prompt, negative prompt) in the browser.
+
+    `input_names` lists the field behind each event input, in order; a field
+    called `negative_prompt` falls back to `default_negative` when empty.
+    """
+    return (
+        _CRAFT_JS.replace("__TEMPLATE__", json.dumps(PROMPT_TEMPLATE))
+        .replace("__NAMES__", json.dumps(input_names))
+        .replace("__DEFAULT_NEGATIVE__", json.dumps(default_negative))
+    )
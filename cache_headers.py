@@ -0,0 +1,37 @@
+"""Long-lived browser caching for the media Gradio serves.
+
+Gradio copies each output into a folder named after a hash of its content,
+so a media URL never changes meaning and browsers may keep it for good.
+`CacheMediaMiddleware` marks those responses immutable. `server.py` adds it
+to the combined app; the media demos pass `app_kwargs()` to `demo.launch()`
+so they get the same headers when run on their own.
+"""
+
+from typing import Any, Dict
+
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+MEDIA_SUFFIXES = (".mp4", ".webm", ".png", ".jpg", ".jpeg", ".webp")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class CacheMediaMiddleware(BaseHTTPMiddleware):
+    """Let browsers keep media files Gradio serves without asking again."""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        response = await call_next(request)
+        path = request.url.path
+        # Gradio's file route already answers Range requests, so partial responses qualify too.
+        is_media = "/gradio_api/file=" in path and path.lower().endswith(MEDIA_SUFFIXES)
+        if is_media and response.status_code in (200, 206):
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+def app_kwargs() -> Dict[str, Any]:
+    """Return `demo.launch(app_kwargs=...)` settings that add CacheMediaMiddleware."""
+    return {"middleware": [Middleware(CacheMediaMiddleware)]}
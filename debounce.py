@@ -0,0 +1,78 @@
+"""Debounced and throttled `.change` events for live-updating inputs.
+
+A plain `textbox.change(fn, ...)` sends one event to the server for every
+keystroke. `debounced(textbox.change, fn, ...)` waits in the browser until
+the value has been still for `wait_ms` and then sends only the latest value
+(trailing edge). Values that were superseded while waiting are never sent.
+With `max_wait_ms`, a value is sent at least that often while the user keeps
+typing, which turns the debounce into a throttle.
+
+The event also uses `trigger_mode="always_last"`: newer values replace each
+other while they wait, and only the last one runs next, so stale work never
+queues up. A second listener on the same trigger cancels the call that is
+already running as soon as the value changes again, so its stale result is
+not shown. Gradio stops a generator or async handler at once; a plain
+function already running in a worker thread runs to its end, but its result
+is dropped.
+"""
+
+import itertools
+import json
+from typing import Any, Callable, List, Optional, Union
+
+import gradio as gr
+
+
+DEFAULT_WAIT_MS = 300
+
+_ids = itertools.count(1)
+
+
+def debounce_js(wait_ms: int, input_count: int, max_wait_ms: Optional[int] = None) -> str:
+    """Return a Gradio `js` function that delays and drops superseded events."""
+    key = json.dumps(f"debounce-{next(_ids)}")
+    max_wait = json.dumps(max_wait_ms)
+    # Gradio passes input values followed by output values; the promise resolves to the
+    # inputs for the Python function, or never resolves if a newer value came in.
+    return f"""
+(...args) => {{
+    const all = (window.__gradioDebounce = window.__gradioDebounce || {{}});
+    const state = (all[{key}] = all[{key}] || {{ seq: 0, first: 0 }});
+    const seq = ++state.seq;
+    const now = Date.now();
+    if (!state.first) state.first = now;
+    const maxWait = {max_wait};
+    const wait = maxWait === null ? {wait_ms} : Math.min({wait_ms}, Math.max(0, state.first + maxWait - now));
+    return new Promise((resolve) => setTimeout(() => {{
+        if (seq !== state.seq) return;
+        state.first = 0;
+        resolve(args.slice(0, {input_count}));
+    }}, wait));
+}}
+"""
+
+
+def debounced(
+    trigger: Callable[..., Any],
+    fn: Callable[..., Any],
+    inputs: Union[gr.components.Component, List[gr.components.Component]],
+    outputs: Union[gr.components.Component, List[gr.components.Component]],
+    wait_ms: int = DEFAULT_WAIT_MS,
+    max_wait_ms: Optional[int] = None,
+    **kwargs: Any,
+) -> Any:
+    """Bind `fn` to an event such as `textbox.change`, debounced in the browser.
+
+    Returns the debounced event. Every new value also cancels it while it runs.
+    """
+    input_count = len(inputs) if isinstance(inputs, list) else 1
+    event = trigger(
+        fn,
+        inputs=inputs,
+        outputs=outputs,
+        js=debounce_js(wait_ms, input_count, max_wait_ms),
+        trigger_mode="always_last",
+        **kwargs,
+    )
+    trigger(None, None, None, cancels=[event])
+    return event
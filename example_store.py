@@ -0,0 +1,127 @@
+"""Precomputed outputs for the `gr.Examples` of the media steps.
+
+`uv run python precompute_examples.py` renders every example once and keeps
+the results under `.cache/examples` (set EXAMPLES_DIR to move them), with a
+small JSON manifest per handler. Unlike the media store in the temp folder,
+they survive reboots and temp cleaners. When
+a user clicks an example, its outputs are looked up in that manifest and
+shown straight away, so demo traffic costs nothing upstream.
+
+Entries are keyed by a hash of the handler name, the example's inputs and any
+fixed settings used to render it. Editing an example therefore changes its
+key: the old result is no longer shown, and the next precompute run renders
+the new one and drops the stale entry. Examples without a stored result just
+fill in the inputs, as before.
+
+The manifest is read on the first click, not at startup.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import gradio as gr
+
+from media_store import save_bytes
+
+
+EXAMPLES_DIR = Path(os.getenv("EXAMPLES_DIR") or Path(".cache") / "examples")
+# Gradio serves these as outputs: it allows files under the working directory.
+EXAMPLE_MEDIA_DIR = EXAMPLES_DIR / "media"
+
+
+def _store(value: Any) -> Any:
+    """Copy files into EXAMPLE_MEDIA_DIR and replace them by `{"media": name}`."""
+    if isinstance(value, (list, tuple)):
+        return [_store(item) for item in value]
+    if isinstance(value, (str, Path)) and len(str(value)) < 4096 and os.path.isfile(value):
+        path = Path(value)
+        saved = save_bytes(path.read_bytes(), path.suffix, prefix="example-", directory=EXAMPLE_MEDIA_DIR)
+        return {"media": saved.name}
+    return value
+
+
+def _resolve(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_resolve(item) for item in value]
+    if isinstance(value, dict) and "media" in value:
+        return str(EXAMPLE_MEDIA_DIR / value["media"])
+    return value
+
+
+def _media_present(value: Any) -> bool:
+    if isinstance(value, list):
+        return all(_media_present(item) for item in value)
+    if isinstance(value, dict) and "media" in value:
+        return (EXAMPLE_MEDIA_DIR / value["media"]).exists()
+    return True
+
+
+class ExampleStore:
+    """Stored outputs for the examples of one handler."""
+
+    def __init__(self, name: str, render: Callable[..., Any], settings: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.render = render
+        self.settings = settings or {}
+        self.path = EXAMPLES_DIR / f"{name}.json"
+        self._entries: Dict[str, List[Any]] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def key(self, inputs: Sequence[Any]) -> str:
+        raw = json.dumps([self.name, list(inputs), self.settings], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self) -> Dict[str, List[Any]]:
+        """Return the manifest, re-reading it only when the file changed."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._mtime:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+                self._mtime = mtime
+            return self._entries
+
+    def lookup(self, output_count: int) -> Callable[..., Any]:
+        """Return a `gr.Examples` fn that shows stored outputs, or leaves them alone."""
+
+        def show_example(*inputs: Any) -> Any:
+            outputs = self._load().get(self.key(inputs))
+            if outputs is None or not _media_present(outputs):
+                values: Tuple[Any, ...] = tuple(gr.skip() for _ in range(output_count))
+            else:
+                values = tuple(_resolve(outputs))
+            return values if output_count > 1 else values[0]
+
+        return show_example
+
+    def precompute(self, examples: Sequence[Sequence[Any]], force: bool = False) -> Tuple[int, int]:
+        """Render missing examples, drop stale ones and return (rendered, reused)."""
+        previous = self._load()
+        entries: Dict[str, List[Any]] = {}
+        rendered = reused = 0
+        for row in examples:
+            key = self.key(row)
+            if not force and key in previous and _media_present(previous[key]):
+                entries[key] = previous[key]
+                reused += 1
+                continue
+            result = self.render(*row)
+            if inspect.isgenerator(result):
+                # Keep the final update of a streaming handler.
+                result = list(result)[-1]
+            outputs = result if isinstance(result, tuple) else (result,)
+            entries[key] = [_store(value) for value in outputs]
+            rendered += 1
+        EXAMPLES_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+        tmp_path.replace(self.path)
+        return rendered, reused
@@ -0,0 +1,167 @@
+"""Hedged requests: race a backup call against a slow first attempt.
+
+A HedgePolicy remembers how long recent calls took. When a call (or the
+first chunk of a stream) has not arrived by the chosen percentile of those
+latencies, the policy starts a second, identical call and uses whichever
+answers first. The other attempt is dropped: a stream is closed as soon as
+its thread gets control back; a plain call cannot be interrupted, so its
+result is ignored.
+
+Only the first attempt's latency is recorded, whether or not it wins. A
+backup that wins is fast by construction; counting it would pull the hedge
+delay down and trigger ever more hedging.
+
+Backup calls are limited by a budget. With `max_extra_load=0.1`, at most
+about one call in ten is hedged, so the extra load on the API stays small.
+
+Hedging is off unless GEMINI_HEDGING=1 is set or `enabled=True` is passed.
+"""
+
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterator, Optional, TypeVar
+
+
+T = TypeVar("T")
+_NO_CHUNK = object()
+
+
+def _start(attempt: Callable[[], None]) -> None:
+    """Run an attempt in a thread that sees the caller's context (spans, slot timers)."""
+    threading.Thread(target=contextvars.copy_context().run, args=(attempt,), daemon=True).start()
+
+
+class HedgePolicy:
+    """Decide when to send a backup request and keep track of the budget."""
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_extra_load: float = 0.1,
+        initial_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        self.percentile = percentile
+        self.max_extra_load = max_extra_load
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.enabled = os.getenv("GEMINI_HEDGING") == "1" if enabled is None else enabled
+        self.hedges_sent = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Return how long to wait before hedging, based on recent latencies."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return ordered[index]
+
+    def record(self, seconds: float) -> None:
+        """Remember the latency of a first attempt and earn hedging budget."""
+        with self._lock:
+            self._latencies.append(seconds)
+            self._credit = min(10.0, self._credit + self.max_extra_load)
+
+    def try_spend(self) -> bool:
+        """Take one unit of budget for a backup call, if there is any left."""
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            self.hedges_sent += 1
+            return True
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Run `fn`, racing a backup call if the first one is slow."""
+        if not self.enabled:
+            return fn()
+
+        started = time.monotonic()
+        results: queue.Queue = queue.Queue()
+
+        def attempt(primary: bool) -> None:
+            try:
+                value = fn()
+            except Exception as exc:  # handed to the caller below
+                results.put((False, exc))
+                return
+            if primary:
+                self.record(time.monotonic() - started)
+            results.put((True, value))
+
+        _start(lambda: attempt(True))
+        attempts = 1
+        try:
+            ok, value = results.get(timeout=self.delay())
+        except queue.Empty:
+            if self.try_spend():
+                _start(lambda: attempt(False))
+                attempts = 2
+            ok, value = results.get()
+        if not ok and attempts == 2:
+            ok, value = results.get()
+        if not ok:
+            raise value
+        return value
+
+    def stream(self, make_stream: Callable[[], Iterator[T]]) -> Iterator[T]:
+        """Yield from the stream whose first chunk arrives first."""
+        if not self.enabled:
+            yield from make_stream()
+            return
+
+        started = time.monotonic()
+        results: queue.Queue = queue.Queue()
+        decided = threading.Event()
+        handoff = threading.Lock()
+
+        def attempt(primary: bool) -> None:
+            try:
+                chunks = make_stream()
+                first = next(chunks, _NO_CHUNK)
+            except Exception as exc:  # handed to the caller below
+                results.put((False, exc, None))
+                return
+            if primary:
+                self.record(time.monotonic() - started)
+            with handoff:
+                if not decided.is_set():
+                    results.put((True, first, chunks))
+                    return
+            getattr(chunks, "close", lambda: None)()
+
+        _start(lambda: attempt(True))
+        attempts = 1
+        try:
+            ok, first, chunks = results.get(timeout=self.delay())
+        except queue.Empty:
+            if self.try_spend():
+                _start(lambda: attempt(False))
+                attempts = 2
+            ok, first, chunks = results.get()
+        if not ok and attempts == 2:
+            ok, first, chunks = results.get()
+        with handoff:
+            decided.set()
+        # A backup that finished at the same moment is still queued; close it.
+        while not results.empty():
+            _, _, loser = results.get_nowait()
+            if loser is not None:
+                getattr(loser, "close", lambda: None)()
+
+        if not ok:
+            raise first
+        if first is _NO_CHUNK:
+            return
+        yield first
+        yield from chunks
@@ -0,0 +1,48 @@
+"""Managed output store for media the demos generate.
+
+Generated images and videos are written once, under a name derived from
+their content, and handed to Gradio as file paths. Gradio serves those files
+as they are, so nothing is decoded or re-encoded on the way to the browser.
+
+The store lives in the system temp folder by default (Gradio is allowed to
+serve files from there). Set MEDIA_OUTPUT_DIR to keep outputs elsewhere.
+"""
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+import metrics
+
+
+OUTPUT_DIR = Path(os.getenv("MEDIA_OUTPUT_DIR") or Path(tempfile.gettempdir()) / "gradio-intro-outputs")
+
+
+def suffix_for(mime_type: Optional[str], default: str) -> str:
+    """Return a file suffix such as ".png" for a MIME type."""
+    if mime_type == "image/jpeg":
+        return ".jpg"
+    return mimetypes.guess_extension(mime_type or "") or default
+
+
+def save_bytes(data: bytes, suffix: str, prefix: str = "", directory: Optional[Path] = None) -> Path:
+    """Write `data` to the store, or to `directory`, and return its path.
+
+    Files are named after a hash of their content, so saving the same bytes
+    twice reuses the existing file.
+    """
+    directory = directory or OUTPUT_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{prefix}{hashlib.sha256(data).hexdigest()[:24]}{suffix}"
+    path = directory / name
+    if not path.exists():
+        # One temp file per thread: parallel renders can produce identical bytes.
+        tmp_path = path.with_name(f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        metrics.MEDIA_BYTES_WRITTEN.inc(len(data))
+    return path
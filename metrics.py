@@ -0,0 +1,319 @@
+"""Prometheus-style metrics for the demos.
+
+Counters, gauges and histograms are kept in memory and rendered in the
+Prometheus text format by `render()`. The combined server (`server.py`)
+exposes them at `/metrics`. A demo started with `uv run python
+stepXX_....py` calls `serve_from_env()`, which serves them on their own port
+when METRICS_PORT is set, for example `METRICS_PORT=9100` (add
+METRICS_HOST=0.0.0.0 to allow remote scrapes).
+The queue of that demo (the `demo` of the script being run) is reported
+without any registration; `server.py` registers each mounted demo by path.
+
+Handler and upstream latencies come from finished tracing spans, so every
+traced call is measured without extra code at the call site.
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import tracing
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Walking the media and cache folders is slow once they hold many files.
+DISK_SCAN_SECONDS = 300
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    """A value that goes up and down, or is computed when metrics are scraped."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]] | None = None,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.collect = collect
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def lines(self) -> List[str]:
+        if self.collect is not None:
+            with self._lock:
+                self._values = dict(self.collect())
+        return super().lines()
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # One slot per bucket, then +Inf, sum.
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        out = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                out.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{labels} {series[-2]}")
+            out.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series[-2]}")
+            out.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]}")
+        return out
+
+
+_registry: List[_Metric] = []
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in list(_registry):
+        body = metric.lines()
+        if body:
+            lines.extend(metric.header())
+            lines.extend(body)
+    return "\n".join(lines) + "\n"
+
+
+def _directory_bytes(path: Path) -> float:
+    if not path.exists():
+        return 0.0
+    return float(sum(entry.stat().st_size for entry in path.rglob("*") if entry.is_file()))
+
+
+_disk_lock = threading.Lock()
+_disk_scan: Dict[str, float] = {}
+
+
+def _media_disk_usage() -> Iterable[Tuple[LabelValues, float]]:
+    """Return the folder sizes from a scan at most DISK_SCAN_SECONDS old.
+
+    Between scans, bytes written by `media_store.save_bytes` are added to the
+    media store size, so new renders show up at the next scrape.
+    """
+    from media_store import OUTPUT_DIR
+
+    with _disk_lock:
+        if time.monotonic() - _disk_scan.get("at", float("-inf")) > DISK_SCAN_SECONDS:
+            _disk_scan["media_store"] = _directory_bytes(OUTPUT_DIR)
+            _disk_scan["cache"] = _directory_bytes(Path(".cache"))
+            _disk_scan["written"] = MEDIA_BYTES_WRITTEN.value()
+            _disk_scan["at"] = time.monotonic()
+        written = MEDIA_BYTES_WRITTEN.value() - _disk_scan["written"]
+        return [(("media_store",), _disk_scan["media_store"] + written), (("cache",), _disk_scan["cache"])]
+
+
+HANDLER_SECONDS = Histogram("demo_handler_seconds", "Time spent in a Gradio event handler.", ["handler"])
+HANDLER_ERRORS = Counter("demo_handler_errors_total", "Handler calls that raised.", ["handler"])
+UPSTREAM_SECONDS = Histogram(
+    "gemini_request_seconds", "Gemini API call latency, including retries.", ["operation", "model"]
+)
+UPSTREAM_IN_FLIGHT = Gauge("gemini_requests_in_flight", "Gemini calls currently running.", ["model"])
+UPSTREAM_ERRORS = Counter("gemini_errors_total", "Gemini API errors by HTTP status.", ["model", "status"])
+RATE_LIMIT_WAIT = Histogram(
+    "gemini_rate_limit_wait_seconds", "Time a call waited for rate-limit budget.", ["model"]
+)
+QUEUE_DEPTH = Gauge("gradio_queue_depth", "Events waiting in a demo's Gradio queue.", ["demo"])
+QUEUE_WAIT = Gauge(
+    "gradio_queue_oldest_wait_seconds", "How long the oldest waiting event has been queued.", ["demo"]
+)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"])
+STREAMED_BYTES = Counter("demo_streamed_bytes_total", "Text bytes streamed to browsers.", ["handler"])
+MEDIA_BYTES_WRITTEN = Counter("media_bytes_written_total", "Bytes written to the media store.")
+DISK_USAGE = Gauge(
+    "media_disk_usage_bytes", "Disk used by generated media and caches.", ["location"], collect=_media_disk_usage
+)
+
+
+def _observe_span(span: tracing.Span) -> None:
+    seconds = ((span.end_ns or span.start_ns) - span.start_ns) / 1e9
+    kind = span.attributes.get("kind")
+    if kind == "handler":
+        HANDLER_SECONDS.observe(seconds, handler=span.name)
+        if span.error:
+            HANDLER_ERRORS.inc(handler=span.name)
+    elif kind == "upstream":
+        UPSTREAM_SECONDS.observe(seconds, operation=span.name, model=span.attributes.get("model", ""))
+
+
+tracing.add_listener(_observe_span)
+
+
+_watched_queues: List[Tuple[str, object]] = []
+
+
+def _queues() -> List[Tuple[str, object]]:
+    """Return the registered demos, or the `demo` of the script being run."""
+    if _watched_queues:
+        return list(_watched_queues)
+    main = sys.modules.get("__main__")
+    demo = getattr(main, "demo", None)
+    if demo is None or not hasattr(demo, "queue"):
+        return []
+    return [(Path(getattr(main, "__file__", "demo")).stem, demo)]
+
+
+def _queue_stats(demo) -> Optional[Tuple[float, float]]:
+    """Return (queued events, seconds the oldest has waited) for a `gr.Blocks` app.
+
+    Gradio has no public API for either, so this reads its internals as of
+    Gradio 5.47 (the version in `uv.lock`): the pending events of each
+    concurrency group and the enqueue time Gradio records per event for its
+    analytics. Only the events still queued are looked at, so the cost does
+    not grow with the number of events served. Returns None, and the queue is
+    left out of the scrape, if a Gradio upgrade changes these attributes.
+    """
+    try:
+        queue = demo._queue
+        pending = [event for events in queue.event_queue_per_concurrency_id.values() for event in events.queue]
+        enqueued = [queue.event_analytics.get(event._id, {}).get("time") for event in pending]
+    except Exception:
+        return None
+    times = [value for value in enqueued if value is not None]
+    return float(len(pending)), (time.time() - min(times) if times else 0.0)
+
+
+def _queue_depths() -> Iterable[Tuple[LabelValues, float]]:
+    """Collect depth and wait of every queue in one pass per scrape.
+
+    QUEUE_DEPTH is registered before QUEUE_WAIT, so the waits set here are
+    rendered in the same scrape.
+    """
+    depths: Dict[LabelValues, float] = {}
+    waits: Dict[LabelValues, float] = {}
+    for name, demo in _queues():
+        stats = _queue_stats(demo)
+        if stats is not None:
+            depths[(name,)], waits[(name,)] = stats
+    with QUEUE_WAIT._lock:
+        QUEUE_WAIT._values = waits
+    return depths.items()
+
+
+QUEUE_DEPTH.collect = _queue_depths
+
+
+def watch_queue(name: str, demo) -> None:
+    """Report the queue of a `gr.Blocks` app under `name` at scrape time.
+
+    Only needed when one process serves several demos, as `server.py` does.
+    """
+    _watched_queues.append((name, demo))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - name required by BaseHTTPRequestHandler
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1") -> None:
+    """Serve `/metrics` on `port` from a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+
+def serve_from_env() -> None:
+    """Serve `/metrics` on METRICS_PORT, if it is set.
+
+    Called where a demo or the server starts, never on import, so tools that
+    import a demo next to a running one do not compete for the port.
+    """
+    if os.getenv("METRICS_PORT"):
+        serve(int(os.environ["METRICS_PORT"]), os.getenv("METRICS_HOST", "127.0.0.1"))
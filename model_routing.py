@@ -0,0 +1,172 @@
+"""Send requests to a faster model while the preferred one is slow or failing.
+
+A ModelRouter watches recent latencies and errors for each model it knows.
+The primary model is used while it meets its latency SLO (for example "p90
+under 4 seconds") and its error rate stays low. If it breaks the SLO, or its
+circuit breaker trips after several failures in a row, requests go to the
+next model in the fallback list. Every `probe_seconds` one request is still
+sent to the primary, so the router notices when it recovers.
+
+Latency is measured from the moment a call got its slot in the local rate
+limiter (see `rate_limits.slot_timer`), so queueing here never counts against
+a model. Only errors that say something about the model count as failures:
+server errors, 429s and timeouts. A rejected prompt does not.
+
+Callers learn which model served a request, so the UI can say so.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from google.genai import errors
+
+import rate_limits
+
+
+T = TypeVar("T")
+
+
+class ModelHealth:
+    """Recent outcomes for one model plus a simple circuit breaker."""
+
+    def __init__(self, window: int) -> None:
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.last_probe = time.monotonic()
+
+
+class ModelRouter:
+    """Pick the preferred model that currently meets its latency SLO."""
+
+    def __init__(
+        self,
+        primary: str,
+        fallbacks: List[str],
+        latency_slo: float,
+        percentile: float = 0.9,
+        max_error_rate: float = 0.5,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 60.0,
+        probe_seconds: float = 30.0,
+        min_samples: int = 5,
+        window: int = 50,
+    ) -> None:
+        self.models = [primary, *fallbacks]
+        self.latency_slo = latency_slo
+        self.percentile = percentile
+        self.max_error_rate = max_error_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_seconds = probe_seconds
+        self.min_samples = min_samples
+        self._health: Dict[str, ModelHealth] = {model: ModelHealth(window) for model in self.models}
+        self._lock = threading.Lock()
+
+    def _meets_slo(self, health: ModelHealth) -> bool:
+        if len(health.samples) < self.min_samples:
+            return True
+        latencies = sorted(seconds for seconds, ok in health.samples if ok)
+        failures = sum(1 for _, ok in health.samples if not ok)
+        if failures / len(health.samples) > self.max_error_rate:
+            return False
+        if not latencies:
+            return False
+        index = min(len(latencies) - 1, int(self.percentile * len(latencies)))
+        return latencies[index] <= self.latency_slo
+
+    def candidates(self) -> List[str]:
+        """Return models to try, in order, for the next request."""
+        now = time.monotonic()
+        healthy: List[str] = []
+        with self._lock:
+            for model in self.models:
+                health = self._health[model]
+                if now < health.open_until:
+                    continue
+                if self._meets_slo(health):
+                    healthy.append(model)
+                elif now - health.last_probe >= self.probe_seconds:
+                    health.last_probe = now
+                    healthy.append(model)
+        return healthy or list(self.models)
+
+    def choose(self) -> str:
+        """Return the model the next request should use."""
+        return self.candidates()[0]
+
+    def record(self, model: str, seconds: float, ok: bool) -> None:
+        """Store the outcome of a request and trip the breaker on repeated failures."""
+        with self._lock:
+            health = self._health[model]
+            health.samples.append((seconds, ok))
+            if ok:
+                health.consecutive_failures = 0
+                return
+            health.consecutive_failures += 1
+            if health.consecutive_failures >= self.failure_threshold:
+                health.open_until = time.monotonic() + self.cooldown_seconds
+                health.consecutive_failures = 0
+
+    @staticmethod
+    def is_model_failure(err: errors.APIError) -> bool:
+        """Return True for errors that reflect on the model: 5xx and 429."""
+        return isinstance(err, errors.ServerError) or err.code == 429
+
+    @staticmethod
+    def elapsed(started: float, slots: List[float]) -> float:
+        """Seconds since the first rate-limit slot was granted, or since `started`."""
+        return time.monotonic() - (slots[0] if slots else started)
+
+    def call(self, fn: Callable[[str], T]) -> Tuple[T, str]:
+        """Run `fn(model)` on the best model and fall back on server or quota errors.
+
+        Returns the result together with the model that produced it.
+        """
+        last_error: Optional[errors.APIError] = None
+        for model in self.candidates():
+            started = time.monotonic()
+            with rate_limits.slot_timer() as slots:
+                try:
+                    result = fn(model)
+                except errors.APIError as err:
+                    if not self.is_model_failure(err):
+                        raise
+                    self.record(model, self.elapsed(started, slots), ok=False)
+                    last_error = err
+                    continue
+            self.record(model, self.elapsed(started, slots), ok=True)
+            return result, model
+        assert last_error is not None
+        raise last_error
+
+    def stream(self, make_stream: Callable[[str], Iterator[T]]) -> Iterator[Tuple[str, T]]:
+        """Yield `(model, chunk)` pairs from the first model whose stream starts.
+
+        Latency is measured to the first chunk, which is what users notice.
+        """
+        last_error: Optional[errors.APIError] = None
+        for model in self.candidates():
+            started = time.monotonic()
+            # Not held across yields: the consumer runs in between.
+            with rate_limits.slot_timer() as slots:
+                try:
+                    chunks = make_stream(model)
+                    first = next(chunks, None)
+                except errors.APIError as err:
+                    if not self.is_model_failure(err):
+                        raise
+                    self.record(model, self.elapsed(started, slots), ok=False)
+                    last_error = err
+                    continue
+            self.record(model, self.elapsed(started, slots), ok=True)
+            if first is None:
+                return
+            yield model, first
+            for chunk in chunks:
+                yield model, chunk
+            return
+        assert last_error is not None
+        raise last_error
@@ -0,0 +1,155 @@
+"""Offline stand-in for the parts of `genai.Client` the demos use.
+
+Nothing leaves the machine: text comes back as filler words, images as flat
+PNGs and videos as a placeholder MP4, each after a delay that resembles the
+real service. Use it to load-test the demos without spending quota:
+
+    GEMINI_BACKEND=offline uv run python server.py
+
+OFFLINE_LATENCY_SCALE stretches or shrinks every delay (0 removes them) and
+OFFLINE_ERROR_RATE makes that fraction of calls fail with a 503.
+"""
+
+import io
+import os
+import random
+import secrets
+import shutil
+import subprocess
+import tempfile
+import time
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+from google.genai import errors
+from PIL import Image
+
+
+LATENCY_SCALE = float(os.getenv("OFFLINE_LATENCY_SCALE", "1"))
+ERROR_RATE = float(os.getenv("OFFLINE_ERROR_RATE", "0"))
+
+TEXT_SECONDS = 1.5
+FIRST_CHUNK_SECONDS = 0.4
+CHUNK_GAP_SECONDS = 0.05
+IMAGE_SECONDS = 4.0
+VIDEO_SECONDS = 45.0
+UPLOAD_SECONDS = 0.3
+DOWNLOAD_SECONDS = 1.0
+VIDEO_BYTES = 2 * 1024 * 1024
+ASPECT_SIZES = {"1:1": (1024, 1024), "16:9": (1408, 768), "9:16": (768, 1408), "4:3": (1280, 896), "3:4": (896, 1280)}
+WORDS = "the quick offline model answers every prompt with a few plausible sounding words".split()
+
+
+def _pause(seconds: float) -> None:
+    time.sleep(seconds * LATENCY_SCALE * random.uniform(0.7, 1.3))
+
+
+def _maybe_fail() -> None:
+    if random.random() < ERROR_RATE:
+        raise errors.ServerError(
+            503, {"error": {"code": 503, "message": "Offline backend is overloaded.", "status": "UNAVAILABLE"}}
+        )
+
+
+def _option(config: Any, name: str, default: Any) -> Any:
+    if config is None:
+        return default
+    if isinstance(config, dict):
+        return config.get(name, default)
+    value = getattr(config, name, None)
+    return default if value is None else value
+
+
+def _filler(words: int) -> str:
+    start = random.randrange(len(WORDS))
+    return " ".join(WORDS[(start + index) % len(WORDS)] for index in range(words))
+
+
+@lru_cache(maxsize=16)
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (90, 120, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def _mp4() -> bytes:
+    """Return a short test clip, or a placeholder of realistic size without ffmpeg."""
+    if shutil.which("ffmpeg"):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "offline.mp4")
+            subprocess.run(
+                ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=duration=8:size=1280x720:rate=24",
+                 "-pix_fmt", "yuv420p", "-movflags", "+faststart", path],
+                check=True,
+            )
+            with open(path, "rb") as handle:
+                return handle.read()
+    ftyp = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+    padding = VIDEO_BYTES - len(ftyp)
+    return ftyp + padding.to_bytes(4, "big") + b"free" + bytes(padding - 8)
+
+
+class _Models:
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> SimpleNamespace:
+        _pause(TEXT_SECONDS)
+        _maybe_fail()
+        return SimpleNamespace(text=_filler(random.randint(40, 120)))
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> Iterator[SimpleNamespace]:
+        _maybe_fail()
+        _pause(FIRST_CHUNK_SECONDS)
+        for _ in range(random.randint(8, 20)):
+            yield SimpleNamespace(text=_filler(6) + " ")
+            _pause(CHUNK_GAP_SECONDS)
+
+    def generate_images(self, model: str, prompt: str, config: Any = None) -> SimpleNamespace:
+        _pause(IMAGE_SECONDS)
+        _maybe_fail()
+        width, height = ASPECT_SIZES.get(_option(config, "aspect_ratio", "1:1"), (1024, 1024))
+        image = SimpleNamespace(image_bytes=_png(width, height), mime_type="image/png")
+        count = int(_option(config, "number_of_images", 1))
+        generated = [
+            SimpleNamespace(image=image, rai_filtered_reason=None, enhanced_prompt=None) for _ in range(count)
+        ]
+        return SimpleNamespace(generated_images=generated)
+
+    def generate_videos(self, model: str, **kwargs: Any) -> SimpleNamespace:
+        _maybe_fail()
+        ready_at = time.monotonic() + VIDEO_SECONDS * LATENCY_SCALE * random.uniform(0.7, 1.3)
+        return SimpleNamespace(name=f"operations/offline-{secrets.token_hex(6)}", done=False, ready_at=ready_at)
+
+
+class _Operations:
+    def get(self, operation: SimpleNamespace) -> SimpleNamespace:
+        if time.monotonic() < operation.ready_at:
+            return operation
+        video = SimpleNamespace(uri=f"offline://{operation.name}", mime_type="video/mp4")
+        response = SimpleNamespace(generated_videos=[SimpleNamespace(video=video)])
+        return SimpleNamespace(
+            name=operation.name, done=True, ready_at=operation.ready_at, error=None, response=response, result=response
+        )
+
+
+class _Files:
+    def upload(self, file: Any, config: Any = None) -> SimpleNamespace:
+        _pause(UPLOAD_SECONDS)
+        name = f"files/offline-{secrets.token_hex(6)}"
+        return SimpleNamespace(name=name, uri=f"offline://{name}", mime_type=_option(config, "mime_type", None))
+
+    def download(self, file: Any) -> bytes:
+        _pause(DOWNLOAD_SECONDS)
+        return _mp4()
+
+    def delete(self, name: str) -> None:
+        return None
+
+
+class Client:
+    """Drop-in for `genai.Client` covering `models`, `operations` and `files`."""
+
+    def __init__(self) -> None:
+        self.models = _Models()
+        self.operations = _Operations()
+        self.files = _Files()
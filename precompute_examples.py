@@ -0,0 +1,36 @@
+"""Render the gr.Examples of the media steps once and store the results.
+
+Usage:
+    uv run python precompute_examples.py
+    uv run python precompute_examples.py --only step12 --force
+
+Each demo looks these results up when an example is clicked (see
+`example_store.py`). Re-run after editing examples: unchanged examples are
+reused, new or edited ones are rendered, and removed ones are dropped.
+"""
+
+import argparse
+import importlib
+
+DEMOS = {
+    "step12": "step12_gemini_image_generation",
+    "step13": "step13_gemini_video_generation",
+    "step15": "step15_advanced_veo_workbench",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute example outputs for the media demos.")
+    parser.add_argument("--only", nargs="*", choices=sorted(DEMOS), help="Limit to these demos.")
+    parser.add_argument("--force", action="store_true", help="Render every example again.")
+    args = parser.parse_args()
+
+    for name in args.only or DEMOS:
+        module = importlib.import_module(DEMOS[name])
+        print(f"{name}: rendering {len(module.EXAMPLES)} examples…", flush=True)
+        rendered, reused = module.example_store.precompute(module.EXAMPLES, force=args.force)
+        print(f"{name}: {rendered} rendered, {reused} already up to date -> {module.example_store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""On-demand profiling for the demos' event handlers.
+
+Profiling is off until it is switched on, and it can be switched on while a
+demo is running. Settings live in a small JSON control file (default
+`.cache/profiling.json`) that every process re-reads about once a second:
+
+    uv run python profiling.py step15.advanced_generate --sample-rate 0.2
+    uv run python profiling.py '*'          # every handler, every call
+    uv run python profiling.py --off
+
+Handler names are the ones passed to `@tracing.traced(...)`. A profiled call
+writes three files to PROFILE_DIR (default `.cache/profiles`):
+
+- `<time>-<handler>.prof` – cProfile data for `snakeviz` or `pstats`.
+- `<time>-<handler>.txt`  – time per area (PIL, Gradio, upstream waits), the
+  hottest functions, and the largest allocations seen by tracemalloc.
+
+`capture(seconds)` samples the stacks of every thread instead. That also
+covers work Gradio does outside the handler, such as serializing outputs,
+and writes a `.folded` file that flame-graph tools can read. The combined
+server exposes it as `POST /profiling/capture?seconds=10` when PROFILING_TOKEN
+is set (see `server.py`).
+
+A control file that cannot be read or parsed is ignored: the last good
+settings stay in force, so a typo never breaks a running handler.
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(Path(".cache") / "profiles")))
+CONTROL_FILE = Path(os.getenv("PROFILE_CONTROL", str(Path(".cache") / "profiling.json")))
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+RELOAD_SECONDS = 1.0
+
+# Where handler time goes, matched against "<file>:<function>" of each frame.
+AREAS: Dict[str, tuple] = {
+    "PIL decode/encode": ("/PIL/", "Imaging"),
+    "Gradio": ("/gradio/", "/gradio_client/"),
+    "upstream (Gemini, network, polling)": (
+        "/google/genai/",
+        "/httpx/",
+        "/httpcore/",
+        "ssl.py",
+        "_ssl.",
+        "socket.py",
+        "time.sleep",
+    ),
+    "rate-limit waits": ("rate_limits.py",),
+}
+# Frames that mean a sampled thread is parked rather than doing work.
+IDLE_FRAMES = ("threading.py:wait", "queue.py:get", "selectors.py:select", "base_events.py:_run_once")
+
+_DEFAULTS: Dict[str, Any] = {
+    "handlers": [name.strip() for name in os.getenv("PROFILE_HANDLERS", "").split(",") if name.strip()],
+    "sample_rate": float(os.getenv("PROFILE_SAMPLE_RATE", "1")),
+    "memory": os.getenv("PROFILE_MEMORY", "1") == "1",
+}
+
+_lock = threading.Lock()
+_settings: Dict[str, Any] = dict(_DEFAULTS)
+_control_mtime: Optional[float] = None
+_checked_at = float("-inf")
+# cProfile can only run one profiler per interpreter, so calls take turns.
+_profiler_lock = threading.Lock()
+_memory_users = 0
+_started_tracemalloc = False
+
+
+def settings() -> Dict[str, Any]:
+    """Return the current settings, re-reading the control file when it changed."""
+    global _settings, _control_mtime, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if now - _checked_at >= RELOAD_SECONDS:
+            _checked_at = now
+            try:
+                mtime: Optional[float] = CONTROL_FILE.stat().st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if mtime != _control_mtime:
+                try:
+                    overrides = json.loads(CONTROL_FILE.read_text(encoding="utf-8")) if mtime else {}
+                except (OSError, ValueError):
+                    overrides = None
+                if isinstance(overrides, dict):
+                    _settings = {**_DEFAULTS, **overrides}
+                    _control_mtime = mtime
+        return dict(_settings)
+
+
+def configure(handlers: List[str], sample_rate: float = 1.0, memory: bool = True) -> Dict[str, Any]:
+    """Write new settings to the control file; an empty list turns profiling off."""
+    global _checked_at
+    CONTROL_FILE.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"handlers": handlers, "sample_rate": max(0.0, min(sample_rate, 1.0)), "memory": memory}
+    # Write a temp file and rename it, so readers never see a half-written file.
+    tmp_path = CONTROL_FILE.with_name(f".{CONTROL_FILE.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp_path, CONTROL_FILE)
+    with _lock:
+        _checked_at = float("-inf")
+    return settings()
+
+
+def _area_of(location: str) -> Optional[str]:
+    for area, patterns in AREAS.items():
+        if any(pattern in location for pattern in patterns):
+            return area
+    return None
+
+
+def _start_tracemalloc() -> None:
+    global _memory_users, _started_tracemalloc
+    with _lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        _memory_users += 1
+
+
+def _stop_tracemalloc() -> None:
+    global _memory_users, _started_tracemalloc
+    with _lock:
+        _memory_users -= 1
+        if _memory_users == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+
+def _output_path(label: str, suffix: str) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return PROFILE_DIR / f"{stamp}-{label}-{secrets.token_hex(3)}{suffix}"
+
+
+class HandlerProfile:
+    """cProfile and tracemalloc data collected for one handler call."""
+
+    def __init__(self, name: str, memory: bool) -> None:
+        self.name = name
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.memory = memory
+        self.before: Optional[tracemalloc.Snapshot] = None
+        if memory:
+            _start_tracemalloc()
+            try:
+                self.before = tracemalloc.take_snapshot()
+            except BaseException:
+                _stop_tracemalloc()
+                raise
+
+    @contextmanager
+    def running(self) -> Iterator[None]:
+        """Profile the enclosed code. Generator handlers enter this once per resume."""
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    def finish(self) -> Path:
+        """Write the `.prof` and `.txt` files and return the summary path."""
+        wall_seconds = time.perf_counter() - self.started
+        allocations: List[str] = []
+        try:
+            if self.before is not None:
+                try:
+                    after = tracemalloc.take_snapshot()
+                finally:
+                    _stop_tracemalloc()
+                for stat in after.compare_to(self.before, "lineno")[:TOP_ALLOCATIONS]:
+                    allocations.append(f"  {stat.size_diff / 1024:+10.1f} KiB  {stat.traceback}")
+        finally:
+            _profiler_lock.release()
+
+        summary_path = _output_path(self.name, ".txt")
+        self.profiler.dump_stats(str(summary_path.with_suffix(".prof")))
+        stats = pstats.Stats(self.profiler)
+
+        area_seconds: Counter = Counter()
+        for (filename, _, function), (_, _, own_seconds, _, _) in stats.stats.items():  # type: ignore[attr-defined]
+            area_seconds[_area_of(f"{filename}:{function}") or "other Python"] += own_seconds
+
+        lines = [f"Handler: {self.name}", f"Wall time: {wall_seconds:.3f}s", "", "Time by area (own time):"]
+        for area, seconds in area_seconds.most_common():
+            lines.append(f"  {seconds:8.3f}s  {area}")
+        for sort_key in ("tottime", "cumulative"):
+            buffer = io.StringIO()
+            pstats.Stats(self.profiler, stream=buffer).sort_stats(sort_key).print_stats(TOP_FUNCTIONS)
+            lines += ["", f"Top {TOP_FUNCTIONS} functions by {sort_key}:", buffer.getvalue().strip()]
+        if allocations:
+            lines += ["", "Largest allocation changes (tracemalloc):", *allocations]
+        summary_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return summary_path
+
+
+def start(name: str) -> Optional[HandlerProfile]:
+    """Return a profile for this call of handler `name`, or None if it is not sampled."""
+    current = settings()
+    handlers = current["handlers"]
+    if not handlers or ("*" not in handlers and name not in handlers):
+        return None
+    if random.random() >= current["sample_rate"]:
+        return None
+    if not _profiler_lock.acquire(blocking=False):
+        # Another call is being profiled right now; skip rather than wait.
+        return None
+    try:
+        return HandlerProfile(name, memory=current["memory"])
+    except BaseException:
+        _profiler_lock.release()
+        raise
+
+
+def capture(seconds: float, interval: float = 0.005) -> Path:
+    """Sample the stacks of every thread for `seconds` and return the summary path."""
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    leaves: Counter = Counter()
+    areas: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack: List[str] = []
+            walker = frame
+            while walker is not None:
+                stack.append(f"{walker.f_code.co_filename}:{walker.f_code.co_name}")
+                walker = walker.f_back
+            leaf = stack[0]
+            if any(idle in leaf for idle in IDLE_FRAMES):
+                continue
+            samples += 1
+            stacks[";".join(reversed(stack))] += 1
+            leaves[f"{leaf}:{frame.f_lineno}"] += 1
+            # Attribute the sample to the innermost frame that belongs to a known area.
+            areas[next((area for area in map(_area_of, stack) if area), "other Python")] += 1
+        time.sleep(interval)
+
+    summary_path = _output_path("capture", ".txt")
+    folded = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    summary_path.with_suffix(".folded").write_text(folded + "\n", encoding="utf-8")
+    lines = [f"Sampled all threads for {seconds:.1f}s every {interval * 1000:.0f} ms: {samples} busy samples", ""]
+    lines.append("Busy samples by area:")
+    for area, count in areas.most_common():
+        lines.append(f"  {count / max(samples, 1):6.1%}  {area}")
+    lines += ["", f"Top {TOP_FUNCTIONS} sampled lines:"]
+    for leaf, count in leaves.most_common(TOP_FUNCTIONS):
+        lines.append(f"  {count / max(samples, 1):6.1%}  {leaf}")
+    summary_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return summary_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Turn handler profiling on or off for running demos.")
+    parser.add_argument("handlers", nargs="*", help="Handler names from @tracing.traced, or '*' for all.")
+    parser.add_argument("--sample-rate", type=float, default=1.0, help="Fraction of calls to profile.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc snapshots.")
+    parser.add_argument("--off", action="store_true", help="Stop profiling.")
+    args = parser.parse_args()
+    handlers = [] if args.off else args.handlers
+    print(json.dumps(configure(handlers, args.sample_rate, not args.no_memory), indent=2))
+
+
+if __name__ == "__main__":
+    main()
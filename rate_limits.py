@@ -0,0 +1,300 @@
+"""Process-wide rate limiting for every Gemini call the demos make.
+
+Each model gets a token bucket for requests per minute (RPM) and, for text
+models, one for tokens per minute (TPM). Calls that would exceed the budget
+wait in a priority queue instead of failing, so interactive clicks go ahead
+of batch work. If Gemini still answers with 429, the model's bucket is
+drained and the call is retried after a back-off.
+
+Wrap a call like this:
+
+    response = rate_limits.call(
+        MODEL_NAME,
+        lambda: client.models.generate_content(model=MODEL_NAME, contents=prompt),
+        tokens=rate_limits.estimate_tokens(prompt),
+    )
+
+Streaming calls use `rate_limits.stream` instead, with the same arguments;
+it yields the chunks and retries until the first one arrives.
+
+Budgets can be overridden with the GEMINI_RATE_LIMITS environment variable,
+for example `{"gemini-2.0-flash": {"rpm": 2000, "tpm": 4000000}}`.
+"""
+
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from google.genai import errors
+
+import metrics
+import tracing
+
+
+INTERACTIVE = 0
+BATCH = 10
+
+DEFAULT_LIMITS: Dict[str, Dict[str, Optional[float]]] = {
+    "gemini-2.0-flash": {"rpm": 15, "tpm": 1_000_000},
+    "gemini-2.0-flash-lite": {"rpm": 30, "tpm": 1_000_000},
+    "imagen-4.0-generate-001": {"rpm": 10, "tpm": None},
+    "veo-3.1-generate-preview": {"rpm": 2, "tpm": None},
+    "veo-3.1-fast-generate-preview": {"rpm": 2, "tpm": None},
+}
+FALLBACK_LIMIT: Dict[str, Optional[float]] = {"rpm": 60, "tpm": None}
+MAX_RETRIES = 4
+RETRY_BASE_SECONDS = 2.0
+
+T = TypeVar("T")
+_NO_CHUNK = object()
+# The list `slot_timer` collects into, if any.
+_slot_times: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar("slot_times", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of a prompt (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class ModelBudget:
+    """RPM and TPM token buckets with a priority queue of waiting callers."""
+
+    def __init__(self, rpm: float, tpm: Optional[float] = None) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm or 0)
+        self._stamp = time.monotonic()
+        self._queue: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._stamp
+        self._stamp = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _seconds_until(self, tokens: int) -> float:
+        """Return how long the head of the queue must wait for its budget."""
+        waits = [(1 - self._requests) * 60 / self.rpm]
+        if self.tpm:
+            waits.append((tokens - self._tokens) * 60 / self.tpm)
+        return max(0.0, *waits)
+
+    def acquire(self, tokens: int = 0, priority: int = INTERACTIVE) -> float:
+        """Block until this call fits in the budget and return the seconds waited."""
+        tokens = min(tokens, int(self.tpm)) if self.tpm else 0
+        ticket = (priority, next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._queue[0] == ticket:
+                        delay = self._seconds_until(tokens)
+                        if delay <= 0:
+                            heapq.heappop(self._queue)
+                            self._requests -= 1
+                            self._tokens -= tokens
+                            self._cond.notify_all()
+                            return time.monotonic() - started
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the TPM bucket once the real token usage is known."""
+        if self.tpm:
+            with self._cond:
+                self._tokens -= actual - estimated
+
+    def pause(self, seconds: float) -> None:
+        """Drain the buckets so new calls wait about `seconds` (used after a 429)."""
+        with self._cond:
+            self._refill()
+            self._requests = min(self._requests, -seconds * self.rpm / 60)
+
+
+_budgets: Dict[str, ModelBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def _configured_limits() -> Dict[str, Dict[str, Optional[float]]]:
+    limits = dict(DEFAULT_LIMITS)
+    override = os.getenv("GEMINI_RATE_LIMITS")
+    if override:
+        for model, values in json.loads(override).items():
+            limits[model] = {**limits.get(model, FALLBACK_LIMIT), **values}
+    return limits
+
+
+def budget(model: str) -> ModelBudget:
+    """Return the shared budget for a model, creating it on first use."""
+    with _budgets_lock:
+        if model not in _budgets:
+            limits = _configured_limits().get(model, FALLBACK_LIMIT)
+            _budgets[model] = ModelBudget(limits["rpm"] or FALLBACK_LIMIT["rpm"], limits["tpm"])
+        return _budgets[model]
+
+
+def configure(model: str, rpm: float, tpm: Optional[float] = None) -> None:
+    """Replace a model's budget, for example from a command-line flag."""
+    with _budgets_lock:
+        _budgets[model] = ModelBudget(rpm, tpm)
+
+
+@contextmanager
+def slot_timer() -> Iterator[List[float]]:
+    """Collect the times (`time.monotonic()`) at which calls in the block got their budget.
+
+    Callers that judge upstream latency, like the model router, measure from
+    the first of these so time spent queueing here does not count. Threads
+    started in the block only report if they run in a copy of its context.
+    """
+    slots: List[float] = []
+    token = _slot_times.set(slots)
+    try:
+        yield slots
+    finally:
+        _slot_times.reset(token)
+
+
+def _acquire(model_budget: ModelBudget, model: str, tokens: int, priority: int, traced: tracing.Span) -> None:
+    waited = model_budget.acquire(tokens, priority)
+    metrics.RATE_LIMIT_WAIT.observe(waited, model=model)
+    traced.add("queue_wait_ms", round(waited * 1000, 3))
+    slots = _slot_times.get()
+    if slots is not None:
+        slots.append(time.monotonic())
+
+
+def _usage(response: Any) -> Optional[int]:
+    """Return the total token count Gemini reported for a response, if any."""
+    total = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+    return total if isinstance(total, int) else None
+
+
+def _retry_delay(err: errors.APIError, attempt: int, model: str, model_budget: ModelBudget) -> float:
+    """Return the back-off before retrying `err`, or re-raise it if it should not be retried."""
+    metrics.UPSTREAM_ERRORS.inc(model=model, status=str(err.code))
+    rate_limited = err.code == 429
+    if not (rate_limited or isinstance(err, errors.ServerError)) or attempt >= MAX_RETRIES:
+        raise err
+    delay = RETRY_BASE_SECONDS * 2**attempt
+    if rate_limited:
+        model_budget.pause(delay)
+        return 0.0
+    return delay
+
+
+def call(
+    model: str,
+    fn: Callable[[], T],
+    tokens: int = 0,
+    priority: int = INTERACTIVE,
+    name: str = "gemini.call",
+) -> T:
+    """Run `fn` within the model's budget, queueing and retrying on 429.
+
+    Server errors (5xx) are retried with the same back-off. Other client
+    errors are raised straight away. The call is traced as a span called
+    `name`, including the time spent waiting for budget. When the response
+    reports its token usage, the TPM bucket is corrected to match.
+    """
+    model_budget = budget(model)
+    attempt = 0
+    with tracing.span(name, kind="upstream", model=model, estimated_tokens=tokens) as traced:
+        while True:
+            _acquire(model_budget, model, tokens, priority, traced)
+            metrics.UPSTREAM_IN_FLIGHT.inc(model=model)
+            try:
+                result = fn()
+            except errors.APIError as err:
+                delay = _retry_delay(err, attempt, model, model_budget)
+            else:
+                actual = _usage(result)
+                if actual is not None:
+                    model_budget.settle(tokens, actual)
+                return result
+            finally:
+                metrics.UPSTREAM_IN_FLIGHT.dec(model=model)
+            time.sleep(delay)
+            attempt += 1
+            traced.set("retries", attempt)
+
+
+def stream(
+    model: str,
+    fn: Callable[[], Iterator[T]],
+    tokens: int = 0,
+    priority: int = INTERACTIVE,
+    name: str = "gemini.stream",
+) -> Iterator[T]:
+    """Yield the chunks of `fn()` within the model's budget, like `call` for streams.
+
+    Streaming APIs only send their request when the first chunk is pulled, so
+    that happens inside the retried section: a 429 or 5xx before the first
+    chunk is retried like in `call`. Errors after it are raised as they are,
+    since a retry would repeat text the user has already seen. The span and
+    the in-flight gauge stay open until the stream ends, and the usage on the
+    last chunk corrects the TPM bucket.
+    """
+    model_budget = budget(model)
+    attempt = 0
+    # Not `tracing.span`: the consumer runs between chunks and must not become its child.
+    attributes = {"kind": "upstream", "model": model, "estimated_tokens": tokens}
+    traced = tracing.Span(name, tracing.current(), attributes)
+    chunks: Optional[Iterator[T]] = None
+    in_flight = False
+    try:
+        while True:
+            _acquire(model_budget, model, tokens, priority, traced)
+            metrics.UPSTREAM_IN_FLIGHT.inc(model=model)
+            in_flight = True
+            try:
+                chunks = iter(fn())
+                first = next(chunks, _NO_CHUNK)
+                break
+            except errors.APIError as err:
+                metrics.UPSTREAM_IN_FLIGHT.dec(model=model)
+                in_flight = False
+                delay = _retry_delay(err, attempt, model, model_budget)
+            time.sleep(delay)
+            attempt += 1
+            traced.set("retries", attempt)
+
+        if first is _NO_CHUNK:
+            return
+        last = first
+        yield first
+        for last in chunks:
+            yield last
+        actual = _usage(last)
+        if actual is not None:
+            model_budget.settle(tokens, actual)
+    except BaseException as exc:
+        if not isinstance(exc, GeneratorExit):
+            traced.error = f"{type(exc).__name__}: {exc}"
+            if getattr(exc, "code", None) is not None:
+                traced.set("error.code", exc.code)
+        raise
+    finally:
+        getattr(chunks, "close", lambda: None)()
+        if in_flight:
+            metrics.UPSTREAM_IN_FLIGHT.dec(model=model)
+        traced.end()
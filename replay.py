@@ -0,0 +1,196 @@
+"""Replay a recorded request log against a running demo server.
+
+Usage:
+    GEMINI_BACKEND=offline uv run python server.py               # terminal 1
+    uv run python replay.py .cache/requests.jsonl                 # original pace
+    uv run python replay.py .cache/requests.jsonl --speed 5       # 5x faster
+    uv run python replay.py .cache/requests.jsonl --speed 0       # as fast as possible
+    uv run python replay.py log.jsonl --handlers step08.respond step12.generate_images
+
+Each log entry (see `request_log.py`) is sent to the same demo and endpoint
+through `gradio_client`, at the same offsets from the first entry divided by
+`--speed`. Prompts are replayed as logged (or as filler text of the same
+length if the log was redacted), and uploads are replaced by generated files
+of the logged size. Run the server with the offline backend so replays cost
+no quota. A latency summary per handler is printed at the end.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from gradio_client import Client, handle_file
+from PIL import Image
+
+
+# Endpoints whose API name is not the handler function's name.
+API_NAMES = {
+    "step01.greet": "/predict",
+    "step02.compute": "/predict",
+    "step08.respond": "/chat",
+    "step10.safe_divide": "/predict",
+}
+IMAGE_SUFFIXES = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}
+
+
+def load_entries(path: Path, handlers: List[str]) -> List[Dict[str, Any]]:
+    """Read a request log, keeping the chosen handlers, oldest first."""
+    entries = []
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if not handlers or entry["handler"] in handlers:
+                entries.append(entry)
+    return sorted(entries, key=lambda entry: entry["ts"])
+
+
+class Inputs:
+    """Turns logged input descriptions back into values for `gradio_client`."""
+
+    def __init__(self, folder: str) -> None:
+        self.folder = Path(folder)
+        self._files: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def value(self, described: Dict[str, Any]) -> Any:
+        kind = described["type"]
+        if kind == "text":
+            return described.get("text") or ("lorem ipsum " * (described["chars"] // 12 + 1))[: described["chars"]]
+        if kind in {"number", "bool"}:
+            return described["value"]
+        if kind == "list":
+            return [self.value(item) for item in described["items"]]
+        if kind == "dict":
+            return {key: self.value(item) for key, item in described["items"].items()}
+        if kind == "image":
+            return handle_file(self._file(".png", 0, described["width"], described["height"]))
+        if kind == "file":
+            return handle_file(
+                self._file(described["suffix"], described["bytes"], described.get("width"), described.get("height"))
+            )
+        return None
+
+    def _file(self, suffix: str, size: int, width: Optional[int], height: Optional[int]) -> str:
+        """Return a generated file shaped like the logged upload, reusing identical ones."""
+        key = f"{width}x{height}-{size}{suffix}"
+        with self._lock:
+            if key not in self._files:
+                path = self.folder / f"upload-{len(self._files)}{suffix}"
+                if width and height and suffix in IMAGE_SUFFIXES:
+                    noise = Image.effect_noise((width, height), 64).convert("RGB")
+                    noise.save(path, format=IMAGE_SUFFIXES[suffix])
+                else:
+                    path.write_bytes(os.urandom(size))
+                self._files[key] = str(path)
+            return self._files[key]
+
+
+class Target:
+    """One `gradio_client.Client` per demo, with its endpoints' parameter names."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url.rstrip("/")
+        self._clients: Dict[str, Client] = {}
+        self._parameters: Dict[str, Dict[str, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, demo: str) -> tuple:
+        with self._lock:
+            if demo not in self._clients:
+                client = Client(f"{self.url}/{demo}/", verbose=False)
+                api = client.view_api(print_info=False, return_format="dict")
+                self._clients[demo] = client
+                self._parameters[demo] = {
+                    name: [parameter["parameter_name"] for parameter in info["parameters"]]
+                    for name, info in api["named_endpoints"].items()
+                }
+            return self._clients[demo], self._parameters[demo]
+
+
+def play(target: Target, inputs: Inputs, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one logged call and return its outcome and latency."""
+    api_name = API_NAMES.get(entry["handler"], f"/{entry['function']}")
+    started = time.perf_counter()
+    try:
+        client, parameters = target.endpoint(entry["demo"])
+        # Only send what the endpoint accepts; state and gr.Request are filled in server-side.
+        kwargs = {
+            name: inputs.value(entry["inputs"][name])
+            for name in parameters.get(api_name, [])
+            if name in entry["inputs"]
+        }
+        client.predict(api_name=api_name, **kwargs)
+        outcome = "ok"
+    except Exception as exc:
+        outcome = f"error: {type(exc).__name__}"
+    return {
+        "handler": entry["handler"],
+        "outcome": outcome,
+        "seconds": time.perf_counter() - started,
+        "recorded_seconds": entry.get("duration_ms", 0) / 1000,
+    }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def print_summary(results: List[Dict[str, Any]], elapsed: float) -> None:
+    by_handler: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for result in results:
+        by_handler[result["handler"]].append(result)
+    print(f"\nReplayed {len(results)} calls in {elapsed:.1f}s")
+    print(f"{'handler':32} {'calls':>6} {'errors':>6} {'p50 s':>8} {'p95 s':>8} {'logged p50':>11}")
+    for handler, rows in sorted(by_handler.items()):
+        seconds = [row["seconds"] for row in rows]
+        errors = sum(row["outcome"] != "ok" for row in rows)
+        logged = _percentile([row["recorded_seconds"] for row in rows], 0.5)
+        print(
+            f"{handler:32} {len(rows):6} {errors:6} {_percentile(seconds, 0.5):8.2f} "
+            f"{_percentile(seconds, 0.95):8.2f} {logged:11.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a request log against running demos.")
+    parser.add_argument("log", type=Path, help="Request log written by request_log.py.")
+    parser.add_argument("--url", default="http://127.0.0.1:7860", help="Base URL of server.py.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up factor; 0 sends as fast as possible.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Most calls in flight at once.")
+    parser.add_argument("--handlers", nargs="*", default=[], help="Only replay these handlers.")
+    args = parser.parse_args()
+
+    entries = load_entries(args.log, args.handlers)
+    if not entries:
+        raise SystemExit("No matching entries in the log.")
+    target = Target(args.url)
+    first_ts = entries[0]["ts"]
+    started = time.monotonic()
+    with tempfile.TemporaryDirectory() as folder, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        inputs = Inputs(folder)
+        futures = []
+        for entry in entries:
+            if args.speed > 0:
+                delay = started + (entry["ts"] - first_ts) / args.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(play, target, inputs, entry))
+        results = []
+        for number, future in enumerate(futures, start=1):
+            results.append(future.result())
+            print(f"\r{number}/{len(futures)} done", end="", flush=True)
+    print_summary(results, time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Structured log of every event-handler call, for replaying realistic load.
+
+Each call to a handler decorated with `@tracing.traced(...)` appends one JSON
+line to REQUEST_LOG (default `.cache/requests.jsonl`):
+
+    {"ts": 1760000000.1, "handler": "step12.generate_images",
+     "demo": "step12", "function": "generate_images",
+     "inputs": {"prompt": {"type": "text", "chars": 42, "text": "..."}, ...},
+     "duration_ms": 8123.4, "first_update_ms": 2011.9, "updates": 3,
+     "outcome": "ok", "output": {"type": "list", "length": 2, ...}}
+
+Inputs and outputs are described by shape and size (text length, image
+dimensions, file size) rather than stored. Only the parameters a handler
+declares as uploads (see `tracing.traced`) are described as files; every
+other string is text, even if it happens to name a file. Prompt text is kept so a replay
+sends the same prompts; set REQUEST_LOG_REDACT=1 to log only its length.
+Set REQUEST_LOG=off to disable the log. `replay.py` plays a log back.
+"""
+
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+
+REQUEST_LOG = os.getenv("REQUEST_LOG", str(Path(".cache") / "requests.jsonl"))
+ENABLED = REQUEST_LOG.lower() not in {"", "0", "off", "false"}
+REDACT = os.getenv("REQUEST_LOG_REDACT", "0") == "1"
+MAX_ITEMS = 20
+
+_write_lock = threading.Lock()
+
+
+def describe(value: Any, redact: bool = REDACT) -> Dict[str, Any]:
+    """Return a small JSON description of a handler input or output."""
+    if value is None:
+        return {"type": "none"}
+    if isinstance(value, bool):
+        return {"type": "bool", "value": value}
+    if isinstance(value, (int, float)):
+        return {"type": "number", "value": value}
+    if isinstance(value, bytes):
+        return {"type": "bytes", "bytes": len(value)}
+    if isinstance(value, (str, Path)):
+        text = str(value)
+        described: Dict[str, Any] = {"type": "text", "chars": len(text)}
+        if not redact:
+            described["text"] = text
+        return described
+    if isinstance(value, (list, tuple)):
+        return {
+            "type": "list",
+            "length": len(value),
+            "items": [describe(item, redact) for item in value[:MAX_ITEMS]],
+        }
+    if isinstance(value, dict):
+        return {"type": "dict", "items": {str(key): describe(item, redact) for key, item in value.items()}}
+    if type(value).__name__ == "Request":
+        # gr.Request is filled in by Gradio, not sent by the browser.
+        return {"type": "request"}
+    if hasattr(value, "size") and hasattr(value, "mode"):
+        width, height = value.size
+        return {"type": "image", "width": width, "height": height, "mode": value.mode}
+    if hasattr(value, "shape"):
+        return {"type": "array", "shape": list(value.shape)}
+    return {"type": type(value).__name__}
+
+
+def describe_upload(value: Any) -> Dict[str, Any]:
+    """Describe an upload parameter: a file path, a list of them, or nothing."""
+    if isinstance(value, (list, tuple)):
+        return {"type": "list", "length": len(value), "items": [describe_upload(item) for item in value[:MAX_ITEMS]]}
+    if isinstance(value, (str, Path)) and os.path.isfile(value):
+        return _describe_file(str(value))
+    return describe(value)
+
+
+def _describe_file(path: str) -> Dict[str, Any]:
+    described: Dict[str, Any] = {"type": "file", "suffix": Path(path).suffix.lower(), "bytes": os.path.getsize(path)}
+    try:
+        from PIL import Image
+
+        # Opening only reads the header, so this stays cheap for large uploads.
+        with Image.open(path) as img:
+            described["width"], described["height"] = img.size
+    except Exception:
+        pass
+    return described
+
+
+class Entry:
+    """One handler call being logged."""
+
+    def __init__(self, name: str, function: str, inputs: Dict[str, Any]) -> None:
+        self.started = time.perf_counter()
+        self.record: Dict[str, Any] = {
+            "ts": round(time.time(), 3),
+            "handler": name,
+            "demo": name.split(".", 1)[0],
+            "function": function,
+            "inputs": inputs,
+        }
+        self.updates = 0
+        self.first_update: Optional[float] = None
+        self.output: Any = None
+
+    def update(self, value: Any) -> None:
+        """Note one value yielded by a generator handler."""
+        if self.first_update is None:
+            self.first_update = time.perf_counter()
+        self.updates += 1
+        self.output = value
+
+
+@contextmanager
+def logged(
+    name: str,
+    fn: Callable[..., Any],
+    args: tuple,
+    kwargs: Dict[str, Any],
+    uploads: Sequence[str] = (),
+) -> Iterator[Entry]:
+    """Log the enclosed call of handler `fn`, its duration and how it ended.
+
+    Parameters named in `uploads` hold file paths from upload components.
+    """
+    inputs: Dict[str, Any] = {}
+    if ENABLED:
+        # Keyed by parameter name, which is also how Gradio names API parameters.
+        bound = inspect.signature(fn).bind_partial(*args, **kwargs)
+        inputs = {
+            key: describe_upload(value) if key in uploads else describe(value)
+            for key, value in bound.arguments.items()
+        }
+    entry = Entry(name, fn.__name__, inputs)
+    outcome, error = "ok", None
+    try:
+        yield entry
+    except GeneratorExit:
+        outcome = "cancelled"
+        raise
+    except BaseException as exc:
+        outcome, error = "error", f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        if ENABLED:
+            record = entry.record
+            record["duration_ms"] = round((time.perf_counter() - entry.started) * 1000, 3)
+            if entry.first_update is not None:
+                record["first_update_ms"] = round((entry.first_update - entry.started) * 1000, 3)
+                record["updates"] = entry.updates
+            record["outcome"] = outcome
+            if error:
+                record["error"] = error
+            else:
+                record["output"] = describe(entry.output, redact=True)
+            _write(record)
+
+
+def _write(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str)
+    with _write_lock:
+        path = Path(REQUEST_LOG)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
@@ -0,0 +1,170 @@
+"""Serve every demo from one process under its own URL path.
+
+Usage:
+    uv run python server.py
+    uv run python server.py --port 8000
+
+All lessons share one FastAPI app, one event loop, one Gemini client and the
+same queue settings, instead of running sixteen separate `demo.launch()`
+processes. Open http://127.0.0.1:7860/ for a list of links;
+Prometheus metrics for all demos are at http://127.0.0.1:7860/metrics.
+Profiling is controlled at /profiling (see `profiling.py`) when PROFILING_TOKEN
+is set; send it as `Authorization: Bearer <token>`. Without the token those
+routes do not exist.
+
+Set GEMINI_BACKEND=offline to answer every Gemini call from the local
+stand-in in `offline_backend.py`, for example while replaying load with
+`replay.py`.
+
+Everything runs in one process: the Gradio queue keeps each event's join
+request and its event stream together in memory, so both must reach the
+same process. To scale out, start several servers on separate ports behind
+a proxy with sticky sessions (by cookie or Gradio session hash), so each
+session always reaches the same server. Session and job state live in the
+shared state backend (see `state_backend.py`), so it survives a restart or
+a session being moved to another server; that does not make the servers
+interchangeable per request, because the queue stays per process. (Step 9's
+`gr.State` only caches Files API uploads; another server simply uploads the
+image again.)
+"""
+
+import argparse
+import importlib
+import os
+import secrets
+import threading
+from types import ModuleType
+from typing import Dict
+
+import gradio as gr
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from google import genai
+
+import cache_headers
+import metrics
+import profiling
+import tracing
+
+
+DEMOS: Dict[str, str] = {
+    "app": "app",
+    "step01": "step01_hello_gradio",
+    "step02": "step02_components",
+    "step03": "step03_blocks_layout",
+    "step04": "step04_state_events",
+    "step05": "step05_file_image",
+    "step06": "step06_gemini_text",
+    "step07": "step07_gemini_stream",
+    "step08": "step08_gemini_chat",
+    "step09": "step09_gemini_vision",
+    "step10": "step10_error_handling",
+    "step11": "step11_styling",
+    "step12": "step12_gemini_image_generation",
+    "step13": "step13_gemini_video_generation",
+    "step14": "step14_gemini_video_interpolation",
+    "step15": "step15_advanced_veo_workbench",
+}
+CONCURRENCY_LIMIT = int(os.getenv("DEMO_CONCURRENCY_LIMIT", "4"))
+MAX_QUEUE_SIZE = int(os.getenv("DEMO_MAX_QUEUE_SIZE", "64"))
+MAX_CAPTURE_SECONDS = 60.0
+
+
+def build_app() -> FastAPI:
+    """Import every lesson and mount its `demo` under `/<name>`."""
+    load_dotenv()
+    if os.getenv("GEMINI_BACKEND", "").lower() == "offline":
+        import offline_backend
+
+        # The lessons still check for a key on import; it is never used.
+        os.environ.setdefault("GEMINI_API_KEY", "offline")
+        shared_client = offline_backend.Client()
+    else:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("Set GEMINI_API_KEY in your environment or .env file.")
+        shared_client = genai.Client(api_key=api_key)
+
+    app = FastAPI(title="Gradio Intro Demos")
+    modules: Dict[str, ModuleType] = {}
+    for path, module_name in DEMOS.items():
+        module = importlib.import_module(module_name)
+        if hasattr(module, "client"):
+            # Handlers look up the module-level `client`, so they all use one pool.
+            module.client = shared_client
+        demo: gr.Blocks = module.demo
+        demo.queue(default_concurrency_limit=CONCURRENCY_LIMIT, max_size=MAX_QUEUE_SIZE)
+        metrics.watch_queue(path, demo)
+        # The beginner steps carry no tracing code; their handlers are traced here.
+        tracing.trace_handlers(demo, path)
+        app = gr.mount_gradio_app(app, demo, path=f"/{path}")
+        modules[path] = module
+
+    links = "".join(
+        f'<li><a href="/{path}/">{path}</a> – {(module.__doc__ or "").strip().splitlines()[0]}</li>'
+        for path, module in modules.items()
+    )
+
+    app.add_middleware(cache_headers.CacheMediaMiddleware)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics() -> str:
+        return metrics.render()
+
+    # Profiling changes process-wide state and costs CPU, so it is only served with a token.
+    profiling_token = os.getenv("PROFILING_TOKEN", "")
+    if profiling_token:
+        expected = f"Bearer {profiling_token}".encode("utf-8")
+        capture_lock = threading.Lock()
+
+        def require_token(authorization: str = Header("")) -> None:
+            if not secrets.compare_digest(authorization.encode("utf-8"), expected):
+                raise HTTPException(status_code=401, detail="Send the profiling token as a Bearer token.")
+
+        admin = [Depends(require_token)]
+
+        @app.get("/profiling", dependencies=admin)
+        def profiling_settings() -> dict:
+            return profiling.settings()
+
+        @app.post("/profiling", dependencies=admin)
+        def configure_profiling(handlers: str = "", sample_rate: float = 1.0, memory: bool = True) -> dict:
+            names = [name.strip() for name in handlers.split(",") if name.strip()]
+            return profiling.configure(names, sample_rate, memory)
+
+        @app.post("/profiling/capture", dependencies=admin)
+        def capture_profile(seconds: float = 10.0) -> dict:
+            if not capture_lock.acquire(blocking=False):
+                raise HTTPException(status_code=409, detail="A capture is already running.")
+            try:
+                # A plain `def` route runs in a worker thread, so sampling does not block the event loop.
+                return {"summary": str(profiling.capture(min(seconds, MAX_CAPTURE_SECONDS)))}
+            finally:
+                capture_lock.release()
+
+    @app.get("/", response_class=HTMLResponse)
+    def index() -> str:
+        return f"<h1>Gradio Intro Demos</h1><ul>{links}</ul>"
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve every demo from one process.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    args = parser.parse_args()
+    # /metrics is always on the app; METRICS_PORT adds a separate listener.
+    metrics.serve_from_env()
+    uvicorn.run(
+        "server:build_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
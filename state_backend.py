@@ -0,0 +1,201 @@
+"""Session and job state kept outside the Gradio process.
+
+`gr.State` lives in the memory of one server process and is lost when that
+process restarts. The demos that run on several servers store their state
+here instead, keyed by the session id Gradio sends with every request
+(`gr.Request.session_hash`). Each session must still be routed to one
+server (sticky sessions), because the Gradio queue is per process; the
+backend keeps the state when a server restarts or a session is moved.
+
+Two backends are included:
+
+- `SQLiteBackend` (the default) keeps everything in one SQLite file, which
+  several processes on the same machine, or on a shared volume, can use at once.
+- `MemoryBackend` keeps state in a dict, for a single process.
+
+Pick one with the STATE_BACKEND environment variable: `sqlite:///path/to/file.db`
+or `memory://`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
+
+
+DEFAULT_URL = "sqlite:///.cache/state.sqlite3"
+
+
+class StateBackend(Protocol):
+    """What the demos need from a state store."""
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any: ...
+
+    def set(self, namespace: str, key: str, value: Any) -> None: ...
+
+    def delete(self, namespace: str, key: str) -> None: ...
+
+    def append(self, namespace: str, key: str, item: Any) -> int: ...
+
+    def length(self, namespace: str, key: str) -> int: ...
+
+    def slice(self, namespace: str, key: str, start: int, stop: int) -> List[Any]: ...
+
+    def scan(self, namespace: str, prefix: str = "") -> List[Tuple[str, Any]]: ...
+
+
+class MemoryBackend:
+    """Dictionary-backed store for a single process."""
+
+    def __init__(self) -> None:
+        self._values: Dict[Tuple[str, str], Any] = {}
+        self._lists: Dict[Tuple[str, str], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._values.get((namespace, key), default)
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._values[(namespace, key)] = value
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._values.pop((namespace, key), None)
+            self._lists.pop((namespace, key), None)
+
+    def append(self, namespace: str, key: str, item: Any) -> int:
+        with self._lock:
+            items = self._lists.setdefault((namespace, key), [])
+            items.append(item)
+            return len(items)
+
+    def length(self, namespace: str, key: str) -> int:
+        with self._lock:
+            return len(self._lists.get((namespace, key), []))
+
+    def slice(self, namespace: str, key: str, start: int, stop: int) -> List[Any]:
+        with self._lock:
+            return list(self._lists.get((namespace, key), [])[start:stop])
+
+    def scan(self, namespace: str, prefix: str = "") -> List[Tuple[str, Any]]:
+        with self._lock:
+            return sorted(
+                (key, value)
+                for (space, key), value in self._values.items()
+                if space == namespace and key.startswith(prefix)
+            )
+
+
+class SQLiteBackend:
+    """Store values as JSON rows in a SQLite file that many processes can share."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " namespace TEXT, key TEXT, value TEXT, updated REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " namespace TEXT, key TEXT, position INTEGER, value TEXT,"
+                " PRIMARY KEY (namespace, key, position))"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, updated) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time()),
+            )
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+            db.execute("DELETE FROM items WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def append(self, namespace: str, key: str, item: Any) -> int:
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            count = self._length(db, namespace, key)
+            db.execute(
+                "INSERT INTO items (namespace, key, position, value) VALUES (?, ?, ?, ?)",
+                (namespace, key, count, json.dumps(item)),
+            )
+            db.execute("COMMIT")
+        return count + 1
+
+    @staticmethod
+    def _length(db: sqlite3.Connection, namespace: str, key: str) -> int:
+        # Positions run 0, 1, 2, ..., so the length is the last one plus one. SQLite
+        # reads MAX straight off the primary key index; COUNT(*) would walk every row.
+        (count,) = db.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM items WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        return count
+
+    def length(self, namespace: str, key: str) -> int:
+        with self._connect() as db:
+            return self._length(db, namespace, key)
+
+    def slice(self, namespace: str, key: str, start: int, stop: int) -> List[Any]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT value FROM items WHERE namespace = ? AND key = ?"
+                " AND position >= ? AND position < ? ORDER BY position",
+                (namespace, key, start, stop),
+            ).fetchall()
+        return [json.loads(value) for (value,) in rows]
+
+    def scan(self, namespace: str, prefix: str = "") -> List[Tuple[str, Any]]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT key, value FROM kv WHERE namespace = ? AND substr(key, 1, ?) = ?"
+                " ORDER BY key",
+                (namespace, len(prefix), prefix),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+
+_backend: Optional[StateBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StateBackend:
+    """Return the process-wide backend chosen by STATE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = os.getenv("STATE_BACKEND", DEFAULT_URL)
+            if url.startswith("memory://"):
+                _backend = MemoryBackend()
+            elif url.startswith("sqlite:///"):
+                _backend = SQLiteBackend(url.removeprefix("sqlite:///"))
+            else:
+                raise RuntimeError(f"Unsupported STATE_BACKEND: {url}")
+        return _backend
@@ -4,34 +4,70 @@ from typing import List, Optional, Tuple
 
 import gradio as gr
 
+from state_backend import get_backend
 
-def add_item(new_item: str, items: Optional[List[str]]):
-    """Store each item in the session state and update the list display."""
-    items = list(items or [])
+
+PAGE_SIZE = 20
+NAMESPACE = "step04_items"
+
+# Items live in the shared state backend, keyed by the Gradio session, so they
+# survive a server restart.
+backend = get_backend()
+
+
+def _window(session: str, start: int) -> List[Tuple[str, Optional[str]]]:
+    """Return one page of items for the list display."""
+    return [(value, None) for value in backend.slice(NAMESPACE, session, start, start + PAGE_SIZE)]
+
+
+def _latest_page(count: int) -> int:
+    """Return the 1-based number of the page that holds the newest item."""
+    return max(1, -(-count // PAGE_SIZE))
+
+
+def add_item(new_item: str, request: gr.Request):
+    """Append the item to the session list and show only the newest page.
+
+    Appending never copies or re-sends the whole list, and the display only
+    ever receives one page, which keeps each add cheap as the list grows.
+    """
     text = (new_item or "").strip()
     if not text:
-        highlighted: List[Tuple[str, Optional[str]]] = [(value, None) for value in items]
-        return items, "", highlighted, "Please type something before adding."
+        return gr.skip(), gr.skip(), gr.skip(), "Please type something before adding."
+
+    count = backend.append(NAMESPACE, request.session_hash, text)
+    page = _latest_page(count)
+    start = (page - 1) * PAGE_SIZE
+    return "", _window(request.session_hash, start), page, f"{count} items saved."
+
 
-    items.append(text)
-    highlighted = [(value, None) for value in items]
-    return items, "", highlighted, ""
+def show_page(page: float, request: gr.Request):
+    """Render the requested page of saved items."""
+    last_page = _latest_page(backend.length(NAMESPACE, request.session_hash))
+    page = min(max(1, int(page or 1)), last_page)
+    return _window(request.session_hash, (page - 1) * PAGE_SIZE), page
+
+
+def forget_items(request: gr.Request) -> None:
+    """Drop the session's items when the browser tab closes."""
+    backend.delete(NAMESPACE, request.session_hash)
 
 
 with gr.Blocks(title="State & Events") as demo:
     gr.Markdown("### Add items and keep them in session memory.")
 
-    items_state = gr.State([])
-
     with gr.Row():
         new_item = gr.Textbox(label="New item", placeholder="Type something…")
         add_btn = gr.Button("Add", variant="primary")
 
     listbox = gr.HighlightedText(label="Saved items", combine_adjacent=True)
+    page_box = gr.Number(label="Page", value=1, precision=0, minimum=1)
     status = gr.Markdown("")
 
-    add_btn.click(add_item, [new_item, items_state], [items_state, new_item, listbox, status])
-    new_item.submit(add_item, [new_item, items_state], [items_state, new_item, listbox, status])
+    add_btn.click(add_item, [new_item], [new_item, listbox, page_box, status])
+    new_item.submit(add_item, [new_item], [new_item, listbox, page_box, status])
+    page_box.submit(show_page, [page_box], [listbox, page_box])
+    demo.unload(forget_items)
 
 
 if __name__ == "__main__":
@@ -1,30 +1,75 @@
 """Step 5: Work with file uploads and images."""
 
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 import gradio as gr
-from PIL import Image
+from PIL import ExifTags, Image, ImageOps
 
+from debounce import debounced
 
-def image_info(img: Image.Image) -> Tuple[str, Image.Image]:
-    """Return the image size and echo the image back to the UI."""
-    if img is None:
-        raise gr.Error("Please upload an image to continue.")
 
+# Larger uploads are refused before any pixels are decoded.
+MAX_PIXELS = 64_000_000
+PREVIEW_SIZE = 512
+EXIF_FIELDS = ["Make", "Model", "DateTime", "Software"]
+
+
+def _describe(img: Image.Image) -> List[str]:
+    """Return size, format and a few EXIF fields, all read from the file header."""
     width, height = img.size
-    info = f"Image size: {width} × {height} pixels"
-    return info, img
+    lines = [
+        f"Image size: {width} × {height} pixels",
+        f"Format: {img.format or 'unknown'} ({img.mode})",
+    ]
+    exif = img.getexif()
+    for field in EXIF_FIELDS:
+        value = exif.get(ExifTags.Base[field])
+        if value:
+            lines.append(f"{field}: {str(value).strip()}")
+    return lines
+
+
+def image_info(path: Optional[str]) -> Tuple[str, Image.Image]:
+    """Return the image details and a small preview.
+
+    `Image.open` only parses the header, so the details and the pixel budget
+    check cost no decoding. The preview is decoded at reduced size: JPEGs in
+    draft mode straight at a fraction of their resolution, so memory stays
+    small however large the photo is. Other formats are decoded once, up to
+    MAX_PIXELS, and shrunk right away.
+    """
+    if path is None:
+        raise gr.Error("Please upload an image to continue.")
+
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            if width * height > MAX_PIXELS:
+                raise gr.Error(
+                    f"This image has {width * height / 1e6:.0f} megapixels; "
+                    f"the limit is {MAX_PIXELS / 1e6:.0f}."
+                )
+            info = "\n".join(_describe(img))
+            img.draft("RGB", (PREVIEW_SIZE, PREVIEW_SIZE))
+            img.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+            # Turn the preview the way the camera was held.
+            preview = ImageOps.exif_transpose(img)
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise gr.Error("That file does not look like an image.") from exc
+    return info, preview
 
 
 with gr.Blocks(title="Files & Images") as demo:
     gr.Markdown("### Upload an image to see its size and a preview.")
 
     with gr.Row():
-        img_in = gr.Image(label="Upload image", type="pil")
+        # gr.File hands over the upload untouched; gr.Image would decode all of it first.
+        img_in = gr.File(label="Upload image", file_types=["image"], type="filepath")
         details = gr.Textbox(label="Details")
         img_out = gr.Image(label="Preview")
 
-    img_in.change(image_info, inputs=img_in, outputs=[details, img_out])
+    # Clearing and re-uploading in quick succession sends only the final image.
+    debounced(img_in.change, image_info, inputs=img_in, outputs=[details, img_out], wait_ms=150)
 
 
 if __name__ == "__main__":
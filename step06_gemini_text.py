@@ -7,6 +7,12 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+import hedging
+import metrics
+import model_routing
+import rate_limits
+import tracing
+
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -15,20 +21,41 @@ if not api_key:
 client = genai.Client(api_key=api_key)
 
 MODEL_NAME = "gemini-2.0-flash"
+FALLBACK_MODELS = ["gemini-2.0-flash-lite"]
+LATENCY_SLO_SECONDS = 8.0
+HEDGE_MAX_PROMPT_TOKENS = 200
+
+# Switches to the lighter model while MODEL_NAME misses its latency SLO or keeps failing.
+router = model_routing.ModelRouter(MODEL_NAME, FALLBACK_MODELS, latency_slo=LATENCY_SLO_SECONDS)
 
+# Set GEMINI_HEDGING=1 to race a backup request against unusually slow answers.
+hedge_policy = hedging.HedgePolicy()
 
+
+@tracing.traced("step06.generate_text")
 def generate_text(prompt: str) -> str:
     """Send the prompt to Gemini and return the full response."""
     if not prompt.strip():
         raise gr.Error("Please enter a prompt.")
 
-    response = client.models.generate_content(
-        model=MODEL_NAME,
-        contents=prompt,
-        config=types.GenerateContentConfig(temperature=0.7),
+    def request(model: str) -> types.GenerateContentResponse:
+        return rate_limits.call(
+            model,
+            lambda: client.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=types.GenerateContentConfig(temperature=0.7),
+            ),
+            tokens=rate_limits.estimate_tokens(prompt),
+            name="generate_content",
+        )
+
+    short_prompt = rate_limits.estimate_tokens(prompt) <= HEDGE_MAX_PROMPT_TOKENS
+    response, served_by = router.call(
+        lambda model: hedge_policy.call(lambda: request(model)) if short_prompt else request(model)
     )
     if response.text:
-        return response.text
+        return f"{response.text}\n\n*Answered by `{served_by}`.*"
     raise gr.Error("The model did not return any text. Please try another prompt.")
 
 
@@ -47,4 +74,5 @@ with gr.Blocks(title="Gemini Text Generator") as demo:
 
 
 if __name__ == "__main__":
+    metrics.serve_from_env()
     demo.launch()
@@ -8,6 +8,10 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+import metrics
+import rate_limits
+import tracing
+
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -18,21 +22,28 @@ client = genai.Client(api_key=api_key)
 MODEL_NAME = "gemini-2.0-flash"
 
 
+@tracing.traced("step07.stream_text")
 def stream_text(prompt: str) -> Iterator[str]:
     """Yield partial Gemini responses so the UI updates live."""
     if not prompt.strip():
         yield "Please enter a prompt to begin."
         return
 
-    stream = client.models.generate_content_stream(
-        model=MODEL_NAME,
-        contents=prompt,
-        config=types.GenerateContentConfig(temperature=0.7),
+    stream = rate_limits.stream(
+        MODEL_NAME,
+        lambda: client.models.generate_content_stream(
+            model=MODEL_NAME,
+            contents=prompt,
+            config=types.GenerateContentConfig(temperature=0.7),
+        ),
+        tokens=rate_limits.estimate_tokens(prompt),
     )
+    stream = tracing.trace_stream(stream, "generate_content_stream", model=MODEL_NAME)
     collected: list[str] = []
     for chunk in stream:
         if chunk.text:
             collected.append(chunk.text)
+            metrics.STREAMED_BYTES.inc(len(chunk.text.encode("utf-8")), handler="step07.stream_text")
             yield "".join(collected)
 
 
@@ -47,4 +58,5 @@ with gr.Blocks(title="Gemini Streaming") as demo:
 
 
 if __name__ == "__main__":
+    metrics.serve_from_env()
     demo.launch()
@@ -8,6 +8,10 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+import metrics
+import rate_limits
+import tracing
+
 
 load_dotenv()
 client = genai.Client()
@@ -33,10 +37,12 @@ def _to_text(content: Any) -> str:
     return ""
 
 
+@tracing.traced("step08.respond")
 def respond(message: str, history: list[dict[str, str]]) -> str:
     """Send the full conversation to Gemini and return its reply."""
     conversation = history + [{"role": "user", "content": message}]
     contents = []
+    characters = len(SYSTEM_PROMPT)
     for entry in conversation:
         text = _to_text(entry.get("content", ""))
         if not text:
@@ -46,6 +52,7 @@ def respond(message: str, history: list[dict[str, str]]) -> str:
             role = "model"
         if role not in {"user", "model"}:
             role = "user"
+        characters += len(text)
         contents.append(
             {
                 "role": role,
@@ -53,12 +60,17 @@ def respond(message: str, history: list[dict[str, str]]) -> str:
             }
         )
 
-    response = client.models.generate_content(
-        model=MODEL_NAME,
-        contents=contents,
-        config=types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
+    response = rate_limits.call(
+        MODEL_NAME,
+        lambda: client.models.generate_content(
+            model=MODEL_NAME,
+            contents=contents,
+            config=types.GenerateContentConfig(
+                system_instruction=SYSTEM_PROMPT,
+            ),
         ),
+        tokens=characters // 4,
+        name="generate_content",
     )
     return response.text or "Sorry, I did not catch that."
 
@@ -72,4 +84,5 @@ demo = gr.ChatInterface(
 
 
 if __name__ == "__main__":
+    metrics.serve_from_env()
     demo.launch()
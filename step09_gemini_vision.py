@@ -1,14 +1,27 @@
 """Step 9: Ask Gemini questions about an uploaded image."""
 
+import csv
+import hashlib
 import io
+import json
 import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import gradio as gr
 from dotenv import load_dotenv
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from PIL import Image
 
+import metrics
+import rate_limits
+import tracing
+from answer_cache import AnswerCache
+
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -17,62 +30,405 @@ if not api_key:
 client = genai.Client(api_key=api_key)
 
 MODEL_NAME = "gemini-2.0-flash"
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+MAX_IMAGE_SIDE = 2048
+MAX_PASSTHROUGH_BYTES = 7 * 1024 * 1024
+ENCODE_QUALITY = 85
+TEMPERATURE = 0.4
+ANSWER_CACHE_DIR = Path(".cache") / "step09_answers"
+MATCH_SIMILAR_IMAGES = False
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+BATCH_WORKERS = 4
+PACK_SIZE = 4
+SMALL_IMAGE_BYTES = 512 * 1024
+IMAGE_TOKENS = 258
+
+answer_cache = AnswerCache(ANSWER_CACHE_DIR, match_similar=MATCH_SIMILAR_IMAGES)
+
+
+def prepare_image(image_path: str) -> Tuple[bytes, str]:
+    """Return image bytes and MIME type that are ready to send to Gemini.
+
+    Uploads that Gemini accepts as they are (a supported format, a modest size,
+    no side longer than MAX_IMAGE_SIDE) are passed through untouched. Anything
+    else is downscaled and encoded once as JPEG, or WebP when it has alpha.
+    """
+    path = Path(image_path)
+    with Image.open(path) as img:
+        # Image.open only parses the header, so this check does not decode pixels.
+        mime_type = PASSTHROUGH_FORMATS.get(img.format or "")
+        fits = max(img.size) <= MAX_IMAGE_SIDE
+        if mime_type and fits and path.stat().st_size <= MAX_PASSTHROUGH_BYTES:
+            return path.read_bytes(), mime_type
+
+        img.draft("RGB", (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+        img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+        buffer = io.BytesIO()
+        if img.mode in {"RGBA", "LA", "PA"} or "transparency" in img.info:
+            img.save(buffer, format="WEBP", quality=ENCODE_QUALITY)
+            return buffer.getvalue(), "image/webp"
+        img.convert("RGB").save(buffer, format="JPEG", quality=ENCODE_QUALITY, optimize=True)
+        return buffer.getvalue(), "image/jpeg"
+
+
+def file_hash(image_path: str) -> str:
+    """Return a SHA-256 digest of the uploaded file's content."""
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _image_part(image_path: str, key: str, session: Dict[str, types.File]) -> types.Part:
+    """Return a part that points at the image, uploading it once per session.
+
+    The first question about an image uploads it through the Files API and
+    remembers the handle under the image's content hash. Follow-up questions
+    only send that handle. If the upload is not possible (for example on a
+    backend without the Files API) the image is sent inline instead.
+    """
+    uploaded = session.get(key)
+    if uploaded is None:
+        try:
+            image_bytes, mime_type = prepare_image(image_path)
+        except (OSError, Image.DecompressionBombError) as exc:
+            raise gr.Error("That file does not look like an image Gemini can read.") from exc
+        try:
+            uploaded = client.files.upload(
+                file=io.BytesIO(image_bytes),
+                config=types.UploadFileConfig(mime_type=mime_type, display_name=f"step09-{key[:16]}"),
+            )
+        except errors.APIError:
+            return types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+        session[key] = uploaded
+    return types.Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type)
+
 
+def release_images(session: Optional[Dict[str, types.File]]) -> None:
+    """Delete every file this session uploaded to the Files API."""
+    if not session:
+        return
+    for uploaded in session.values():
+        try:
+            client.files.delete(name=uploaded.name)
+        except errors.APIError:
+            pass  # Uploaded files expire on their own after 48 hours.
+    session.clear()
 
-def describe_image(question: str, img: Image.Image) -> str:
-    """Send both the text question and the image to Gemini Vision."""
-    if img is None:
+
+def start_over(session: Dict[str, types.File]):
+    """Forget the uploaded images and clear the form."""
+    release_images(session)
+    return None, None, "", ""
+
+
+@tracing.traced("step09.describe_image", uploads=["image_path"])
+def describe_image(
+    question: str,
+    image_path: Optional[str],
+    session: Dict[str, types.File],
+) -> str:
+    """Send both the text question and the image to Gemini Vision.
+
+    Answers are cached by image content, question and model settings, so a
+    repeated question about the same image is answered without calling Gemini.
+    """
+    if not image_path:
         raise gr.Error("Please upload an image.")
 
     prompt = question.strip() or "Describe this image briefly."
 
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    image_bytes = buffer.getvalue()
+    content_hash = file_hash(image_path)
+    try:
+        image_id = answer_cache.image_id(image_path, content_hash)
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise gr.Error("That file does not look like an image Gemini can read.") from exc
+    cache_key = answer_cache.key(image_id, prompt, f"{MODEL_NAME}|temperature={TEMPERATURE}")
+    cached = answer_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     contents = types.UserContent(
         parts=[
             types.Part.from_text(text=prompt),
-            types.Part.from_bytes(data=image_bytes, mime_type="image/png"),
+            _image_part(image_path, content_hash, session),
         ]
     )
 
-    response = client.models.generate_content(
-        model=MODEL_NAME,
-        contents=[contents],
-        config=types.GenerateContentConfig(temperature=0.4),
+    response = rate_limits.call(
+        MODEL_NAME,
+        lambda: client.models.generate_content(
+            model=MODEL_NAME,
+            contents=[contents],
+            config=types.GenerateContentConfig(temperature=TEMPERATURE),
+        ),
+        tokens=rate_limits.estimate_tokens(prompt) + IMAGE_TOKENS,
+        name="generate_content",
     )
     if response.text:
+        answer_cache.put(cache_key, response.text)
         return response.text
     raise gr.Error("Gemini did not return an answer. Please try another image.")
 
 
+def collect_images(paths: List[str], workdir: Path) -> List[Path]:
+    """Expand uploaded files, folders and zip archives into a sorted image list."""
+    images: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            images.extend(p for p in path.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+        elif path.suffix.lower() == ".zip":
+            # One folder per archive, so archives with the same name do not collide.
+            target = workdir / path.stem
+            copy = 1
+            while target.exists():
+                target = workdir / f"{path.stem}-{copy}"
+                copy += 1
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.infolist():
+                    name = Path(member.filename)
+                    if member.is_dir() or name.suffix.lower() not in IMAGE_SUFFIXES:
+                        continue
+                    if name.is_absolute() or ".." in name.parts:
+                        continue
+                    archive.extract(member, target)
+                    images.append(target / name)
+        elif path.suffix.lower() in IMAGE_SUFFIXES:
+            images.append(path)
+    return sorted(images)
+
+
+def _ask_one(prompt: str, image_path: Path) -> List[str]:
+    """Ask the question about a single image."""
+    image_bytes, mime_type = prepare_image(str(image_path))
+    contents = types.UserContent(
+        parts=[
+            types.Part.from_text(text=prompt),
+            types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
+        ]
+    )
+    response = rate_limits.call(
+        MODEL_NAME,
+        lambda: client.models.generate_content(
+            model=MODEL_NAME,
+            contents=[contents],
+            config=types.GenerateContentConfig(temperature=TEMPERATURE),
+        ),
+        tokens=rate_limits.estimate_tokens(prompt) + IMAGE_TOKENS,
+        priority=rate_limits.BATCH,
+        name="generate_content",
+    )
+    if not response.text:
+        raise ValueError("Gemini did not return an answer.")
+    return [response.text]
+
+
+def _ask_pack(prompt: str, image_paths: List[Path]) -> Tuple[List[str], bool]:
+    """Ask the same question about several small images in one request.
+
+    Gemini is asked for a JSON list with one answer per image. If the reply
+    does not line up with the images, each image is asked on its own instead.
+    Returns the answers and whether they came from a packed request.
+    """
+    if len(image_paths) == 1:
+        return _ask_one(prompt, image_paths[0]), False
+
+    parts = [
+        types.Part.from_text(
+            text=(
+                f"You will see {len(image_paths)} images. Answer the question below separately "
+                "for each image, in the order shown. Reply with a JSON list of strings, one "
+                f"answer per image.\n\nQuestion: {prompt}"
+            )
+        )
+    ]
+    for index, image_path in enumerate(image_paths, start=1):
+        image_bytes, mime_type = prepare_image(str(image_path))
+        parts.append(types.Part.from_text(text=f"Image {index}:"))
+        parts.append(types.Part.from_bytes(data=image_bytes, mime_type=mime_type))
+
+    response = rate_limits.call(
+        MODEL_NAME,
+        lambda: client.models.generate_content(
+            model=MODEL_NAME,
+            contents=[types.UserContent(parts=parts)],
+            config=types.GenerateContentConfig(
+                temperature=TEMPERATURE,
+                response_mime_type="application/json",
+            ),
+        ),
+        tokens=rate_limits.estimate_tokens(prompt) + IMAGE_TOKENS * len(image_paths),
+        priority=rate_limits.BATCH,
+        name="generate_content",
+    )
+    try:
+        answers = json.loads(response.text or "")
+    except json.JSONDecodeError:
+        answers = None
+    if (
+        not isinstance(answers, list)
+        or len(answers) != len(image_paths)
+        or not all(isinstance(answer, str) and answer for answer in answers)
+    ):
+        return [_ask_one(prompt, image_path)[0] for image_path in image_paths], False
+    return answers, True
+
+
+def _write_results(rows: List[List[str]], results_path: Path) -> None:
+    with results_path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["image", "status", "answer"])
+        writer.writerows(rows)
+
+
+@tracing.traced("step09.describe_batch", uploads=["paths"])
+def describe_batch(
+    question: str,
+    paths: Optional[List[str]],
+) -> Iterator[Tuple[List[List[str]], str]]:
+    """Ask one question about many images and stream the results table.
+
+    Up to BATCH_WORKERS requests run at the same time and small images are
+    packed PACK_SIZE to a request. Requests queue behind interactive questions
+    in the shared rate limiter. Every answer goes into the answer cache, so
+    re-running an interrupted batch only asks about the images still missing.
+    Extracted images are deleted when the batch ends or is cancelled.
+    """
+    if not paths:
+        raise gr.Error("Upload a folder, a zip file, or several images.")
+
+    prompt = question.strip() or "Describe this image briefly."
+    settings = f"{MODEL_NAME}|temperature={TEMPERATURE}"
+    # A packed request wraps the question in other instructions and asks for JSON, so
+    # its answers are stored apart: the single-image tab never shows them.
+    packed_settings = f"{settings}|packed={PACK_SIZE}"
+    # Extracted archives and the results CSV are removed once the batch ends;
+    # Gradio has already copied each yielded CSV into its own cache by then.
+    with tempfile.TemporaryDirectory(prefix="step09-batch-", ignore_cleanup_errors=True) as tmp:
+        workdir = Path(tmp)
+        images = collect_images(paths, workdir)
+        if not images:
+            raise gr.Error("No images found in the upload.")
+
+        # Name extracted images by their path inside the archive: a/x.jpg and b/x.jpg differ.
+        rows = [
+            [image.relative_to(workdir).as_posix() if image.is_relative_to(workdir) else image.name, "queued", ""]
+            for image in images
+        ]
+        row_of = {image: index for index, image in enumerate(images)}
+        cache_keys: Dict[Path, Tuple[str, str]] = {}
+        small: List[Path] = []
+        large: List[Path] = []
+        for image in images:
+            try:
+                image_id = answer_cache.image_id(str(image), file_hash(str(image)))
+            except (OSError, Image.DecompressionBombError):
+                rows[row_of[image]][1:] = ["failed", "Not a readable image."]
+                continue
+            cache_keys[image] = (
+                answer_cache.key(image_id, prompt, settings),
+                answer_cache.key(image_id, prompt, packed_settings),
+            )
+            single_key, packed_key = cache_keys[image]
+            cached = answer_cache.get(single_key) or answer_cache.get(packed_key)
+            if cached is not None:
+                rows[row_of[image]][1:] = ["cached", cached]
+            elif image.stat().st_size <= SMALL_IMAGE_BYTES:
+                small.append(image)
+            else:
+                large.append(image)
+
+        results_path = workdir / "results.csv"
+        _write_results(rows, results_path)
+        yield rows, str(results_path)
+
+        batches = [small[i : i + PACK_SIZE] for i in range(0, len(small), PACK_SIZE)]
+        batches += [[image] for image in large]
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+            pending: Dict[Future, List[Path]] = {
+                pool.submit(_ask_pack, prompt, batch): batch for batch in batches
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = pending.pop(future)
+                    try:
+                        answers, packed = future.result()
+                    except Exception as err:  # reported per image; the rest of the batch goes on
+                        for image in batch:
+                            rows[row_of[image]][1:] = ["failed", f"{type(err).__name__}: {err}"]
+                        continue
+                    for image, answer in zip(batch, answers):
+                        single_key, packed_key = cache_keys[image]
+                        answer_cache.put(packed_key if packed else single_key, answer)
+                        rows[row_of[image]][1:] = ["done", answer]
+                _write_results(rows, results_path)
+                yield rows, str(results_path)
+
+
 with gr.Blocks(title="Gemini Vision Q&A") as demo:
     gr.Markdown("### Upload an image and ask a question about it.")
 
-    with gr.Row():
-        image_input = gr.Image(type="pil", label="Upload image")
-        question_box = gr.Textbox(
-            label="Question",
-            placeholder="Example: What is happening in this picture?",
-        )
+    # Maps image content hashes to Files API uploads; cleaned up when the session ends.
+    uploads_state = gr.State({}, delete_callback=release_images)
+
+    with gr.Tab("Single image"):
+        with gr.Row():
+            # gr.File hands over the original upload; gr.Image would re-save it first.
+            image_input = gr.File(label="Upload image", file_types=["image"], type="filepath")
+            image_preview = gr.Image(label="Preview", interactive=False)
+            question_box = gr.Textbox(
+                label="Question",
+                placeholder="Example: What is happening in this picture?",
+            )
+
+        answer_box = gr.Markdown(label="Answer")
+        with gr.Row():
+            ask_button = gr.Button("Ask Gemini", variant="primary")
+            reset_button = gr.Button("Start Over")
 
-    answer_box = gr.Markdown(label="Answer")
-    with gr.Row():
-        ask_button = gr.Button("Ask Gemini", variant="primary")
-        reset_button = gr.Button("Start Over")
+    with gr.Tab("Batch"):
+        gr.Markdown(
+            "Ask one question about a whole set of images. "
+            "Re-run an interrupted batch to resume where it stopped."
+        )
+        with gr.Row():
+            batch_input = gr.File(
+                label="Images or zip archives",
+                file_count="multiple",
+                file_types=["image", ".zip"],
+                type="filepath",
+            )
+            batch_question = gr.Textbox(
+                label="Question for every image",
+                placeholder="Example: Write short alt text for this product photo.",
+            )
+        batch_button = gr.Button("Run Batch", variant="primary")
+        batch_table = gr.Dataframe(headers=["image", "status", "answer"], label="Results", wrap=True)
+        batch_download = gr.File(label="Download results (CSV)")
 
+    image_input.change(lambda path: path, inputs=image_input, outputs=image_preview)
     ask_button.click(
         describe_image,
-        inputs=[question_box, image_input],
+        inputs=[question_box, image_input, uploads_state],
         outputs=answer_box,
     )
+
     reset_button.click(
-        lambda: (None, "", ""),
-        inputs=[],
-        outputs=[image_input, question_box, answer_box],
+        start_over,
+        inputs=[uploads_state],
+        outputs=[image_input, image_preview, question_box, answer_box],
+    )
+    batch_button.click(
+        describe_batch,
+        inputs=[batch_question, batch_input],
+        outputs=[batch_table, batch_download],
     )
 
 
 if __name__ == "__main__":
+    metrics.serve_from_env()
     demo.launch()
@@ -2,14 +2,23 @@
 
 import gradio as gr
 
+from debounce import debounced
+
 
 theme = gr.themes.Soft()
 
+
+def show_text(text: str) -> str:
+    """Echo what the user wrote as Markdown."""
+    return f"**You wrote:** {text}"
+
+
 with gr.Blocks(title="Themed App", theme=theme) as demo:
     gr.Markdown("## Nice theme ✨")
     user_text = gr.Textbox(label="Say something")
     output = gr.Markdown()
-    user_text.change(lambda text: f"**You wrote:** {text}", inputs=user_text, outputs=output)
+    # Update once typing pauses instead of on every keystroke.
+    debounced(user_text.change, show_text, inputs=user_text, outputs=output)
 
 
 if __name__ == "__main__":
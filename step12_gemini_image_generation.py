@@ -1,14 +1,20 @@
 """Step 12: Generate brand-new images from a text prompt with Gemini."""
 
-import io
 import os
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Tuple
 
 import gradio as gr
 from dotenv import load_dotenv
 from google import genai
 from google.genai import errors, types
-from PIL import Image
+
+import cache_headers
+import metrics
+import rate_limits
+import tracing
+from example_store import ExampleStore
+from media_store import save_bytes, suffix_for
 
 
 load_dotenv()
@@ -19,46 +25,123 @@ client = genai.Client(api_key=api_key)
 
 IMAGE_MODEL = "imagen-4.0-generate-001"
 DEFAULT_ASPECT = "1:1"
+MAX_IMAGES_PER_REQUEST = 4
+MAX_PARALLEL_REQUESTS = 4
 
 
-def generate_image(prompt: str, aspect_ratio: str) -> Tuple[Image.Image, str]:
-    """Create a single Gemini image and return it with a short status string."""
-    prompt = prompt.strip()
-    if not prompt:
-        raise gr.Error("Add a short description of what you want to see.")
-
-    try:
-        response = client.models.generate_images(
+def _request_images(
+    prompt: str, aspect_ratio: str, count: int, priority: int = rate_limits.INTERACTIVE
+) -> List[types.GeneratedImage]:
+    """Ask Imagen for `count` images in a single request."""
+    response = rate_limits.call(
+        IMAGE_MODEL,
+        lambda: client.models.generate_images(
             model=IMAGE_MODEL,
             prompt=prompt,
             config=types.GenerateImagesConfig(
-                number_of_images=1,
+                number_of_images=count,
                 aspect_ratio=aspect_ratio or None,
+                include_rai_reason=True,
             ),
-        )
-    except errors.ClientError as err:
-        raise gr.Error(
-            f"Gemini image generation failed ({err.status}). "
-            f"{err.message} Ensure your account has access to {IMAGE_MODEL}."
-        ) from err
-
-    images = response.generated_images or []
-    if not images:
-        raise gr.Error("Gemini did not return an image. Try another prompt.")
+        ),
+        priority=priority,
+        name="generate_images",
+    )
+    return response.generated_images or []
+
+
+@tracing.traced("step12.generate_images")
+def generate_images(
+    prompt: str,
+    aspect_ratio: str,
+    count: int = 1,
+    *,
+    priority: int = rate_limits.INTERACTIVE,
+) -> Iterator[Tuple[List[Tuple[str, str]], str]]:
+    """Create `count` Gemini images and stream them into the gallery as they arrive.
+
+    Imagen returns at most MAX_IMAGES_PER_REQUEST images per call, so larger
+    counts are split into several requests that run in parallel. Images the
+    safety filter removed, and requests that failed for any reason (API
+    errors, timeouts, dropped connections), are listed in the status instead
+    of failing the batch.
+
+    Batch jobs pass `priority=rate_limits.BATCH` so they queue behind users.
+
+    The returned bytes are saved to the media store in their original format
+    and shown by path, so the server never decodes or re-encodes them.
+    """
+    prompt = prompt.strip()
+    if not prompt:
+        raise gr.Error("Add a short description of what you want to see.")
 
-    generated = images[0]
-    if generated.rai_filtered_reason:
+    count = max(1, int(count or 1))
+    sizes = [
+        min(MAX_IMAGES_PER_REQUEST, count - start)
+        for start in range(0, count, MAX_IMAGES_PER_REQUEST)
+    ]
+
+    gallery: List[Tuple[str, str]] = []
+    notes: List[str] = []
+    used_prompt = prompt
+
+    def progress() -> str:
+        status = [
+            f"Prompt sent to the model: `{used_prompt}`",
+            f"Received {len(gallery)} of {count} images.",
+        ]
+        return "\n\n".join(status + notes)
+
+    with ThreadPoolExecutor(max_workers=min(len(sizes), MAX_PARALLEL_REQUESTS)) as pool:
+        futures = [pool.submit(_request_images, prompt, aspect_ratio, size, priority) for size in sizes]
+        for future in as_completed(futures):
+            try:
+                images = future.result()
+            except Exception as err:
+                # One failed request only costs its own images; the others still arrive.
+                if isinstance(err, errors.APIError):
+                    note = f"A request failed ({err.status}). {err.message}"
+                else:
+                    note = f"A request failed ({type(err).__name__}: {err})."
+                if isinstance(err, errors.ClientError):
+                    note += f" Ensure your account has access to {IMAGE_MODEL}."
+                notes.append(note)
+                yield gallery, progress()
+                continue
+
+            for generated in images:
+                if generated.rai_filtered_reason:
+                    notes.append(f"One image was blocked: {generated.rai_filtered_reason}")
+                    continue
+                if not generated.image or not generated.image.image_bytes:
+                    notes.append("One image came back empty.")
+                    continue
+                image_path = save_bytes(
+                    generated.image.image_bytes,
+                    suffix_for(generated.image.mime_type, ".png"),
+                    prefix="imagen-",
+                )
+                used_prompt = generated.enhanced_prompt or used_prompt
+                gallery.append((str(image_path), f"Candidate {len(gallery) + 1}"))
+
+            yield gallery, progress()
+
+    if not gallery:
         raise gr.Error(
-            f"Gemini blocked this request: {generated.rai_filtered_reason}. "
-            "Try rephrasing your prompt."
+            "Gemini did not return an image. "
+            + (" ".join(notes) or "Try another prompt.")
         )
 
-    if not generated.image or not generated.image.image_bytes:
-        raise gr.Error("Gemini returned empty image bytes. Please try again.")
 
-    image = Image.open(io.BytesIO(generated.image.image_bytes)).convert("RGB")
-    used_prompt = generated.enhanced_prompt or prompt
-    return image, f"Prompt sent to the model: `{used_prompt}`"
+EXAMPLES = [
+    ["A friendly robot chef cooking ramen in a neon-lit kitchen", DEFAULT_ASPECT],
+    ["An aerial photo of futuristic floating islands at sunrise", "16:9"],
+    ["A stained glass window depicting a peaceful forest temple", "3:4"],
+]
+# Part of every stored example's key: a new model renders the examples again.
+EXAMPLE_SETTINGS = {"model": IMAGE_MODEL, "count": 1}
+# Filled by `uv run python precompute_examples.py`; clicks on stored examples cost no quota.
+example_store = ExampleStore("step12.generate_images", generate_images, EXAMPLE_SETTINGS)
 
 
 with gr.Blocks(title="Gemini Image Generator") as demo:
@@ -78,36 +161,37 @@ with gr.Blocks(title="Gemini Image Generator") as demo:
             value=DEFAULT_ASPECT,
             label="Aspect ratio",
         )
+        count_slider = gr.Slider(1, 16, value=4, step=1, label="Number of images")
 
     with gr.Row():
-        submit = gr.Button("Generate Image", variant="primary")
+        submit = gr.Button("Generate Images", variant="primary")
         reset = gr.Button("Start Over")
 
     with gr.Row():
-        output_image = gr.Image(label="Generated image")
+        output_gallery = gr.Gallery(label="Generated images", columns=4, type="filepath")
         prompt_details = gr.Markdown(label="Model settings")
 
     gr.Examples(
-        examples=[
-            ["A friendly robot chef cooking ramen in a neon-lit kitchen", DEFAULT_ASPECT],
-            ["An aerial photo of futuristic floating islands at sunrise", "16:9"],
-            ["A stained glass window depicting a peaceful forest temple", "3:4"],
-        ],
+        examples=EXAMPLES,
         inputs=[prompt_box, aspect_choice],
+        outputs=[output_gallery, prompt_details],
+        fn=example_store.lookup(2),
+        run_on_click=True,
         label="Need ideas?",
     )
 
     submit.click(
-        generate_image,
-        inputs=[prompt_box, aspect_choice],
-        outputs=[output_image, prompt_details],
+        generate_images,
+        inputs=[prompt_box, aspect_choice, count_slider],
+        outputs=[output_gallery, prompt_details],
     )
 
     reset.click(
-        lambda: ("", DEFAULT_ASPECT, None, ""),
+        lambda: ("", DEFAULT_ASPECT, 4, None, ""),
         inputs=[],
-        outputs=[prompt_box, aspect_choice, output_image, prompt_details],
+        outputs=[prompt_box, aspect_choice, count_slider, output_gallery, prompt_details],
     )
 
 if __name__ == "__main__":
-    demo.launch()
+    metrics.serve_from_env()
+    demo.launch(app_kwargs=cache_headers.app_kwargs())
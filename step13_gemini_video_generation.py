@@ -1,9 +1,7 @@
 """Step 13: Generate short videos from text prompts using Gemini."""
 
 import os
-import tempfile
 import time
-from pathlib import Path
 from typing import Tuple
 
 import gradio as gr
@@ -11,6 +9,14 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import errors, types
 
+import cache_headers
+import metrics
+import rate_limits
+import tracing
+from example_store import ExampleStore
+from media_store import save_bytes
+from video_tools import faststart
+
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -26,18 +32,24 @@ MAX_POLLS = 30
 def _wait_for_video(operation: types.GenerateVideosOperation) -> types.GenerateVideosOperation:
     """Poll the long-running operation until the video is ready or fails."""
     polls = 0
-    while not operation.done:
-        if polls >= MAX_POLLS:
-            raise gr.Error(
-                "Video generation is taking longer than expected. "
-                "Please try again in a moment."
-            )
-        time.sleep(POLL_SECONDS)
-        operation = client.operations.get(operation)
-        polls += 1
+    # The span's duration is the render time as seen from here (queue plus render on Veo's side).
+    with tracing.span("veo.wait_for_video", poll_seconds=POLL_SECONDS) as traced:
+        while not operation.done:
+            if polls >= MAX_POLLS:
+                raise gr.Error(
+                    "Video generation is taking longer than expected. "
+                    "Please try again in a moment."
+                )
+            time.sleep(POLL_SECONDS)
+            poll_started = time.perf_counter()
+            operation = client.operations.get(operation)
+            traced.add("poll_overhead_ms", round((time.perf_counter() - poll_started) * 1000, 3))
+            polls += 1
+        traced.set("polls", polls)
     return operation
 
 
+@tracing.traced("step13.generate_video")
 def generate_video(prompt: str) -> Tuple[str, str]:
     """Generate a video and return the local file path plus status details."""
     prompt = prompt.strip()
@@ -45,9 +57,13 @@ def generate_video(prompt: str) -> Tuple[str, str]:
         raise gr.Error("Describe the video you want Gemini to create.")
 
     try:
-        operation = client.models.generate_videos(
-            model=VIDEO_MODEL,
-            prompt=prompt,
+        operation = rate_limits.call(
+            VIDEO_MODEL,
+            lambda: client.models.generate_videos(
+                model=VIDEO_MODEL,
+                prompt=prompt,
+            ),
+            name="generate_videos",
         )
     except errors.ClientError as err:
         raise gr.Error(
@@ -72,22 +88,31 @@ def generate_video(prompt: str) -> Tuple[str, str]:
         raise gr.Error("Gemini returned an empty video. Please try again.")
 
     try:
-        video_bytes = client.files.download(file=generated.video)
+        with tracing.span("files.download") as traced:
+            video_bytes = client.files.download(file=generated.video)
+            traced.set("bytes", len(video_bytes))
     except errors.ClientError as err:
         raise gr.Error(
             f"Gemini finished but downloading the video failed ({err.status}). "
             "Please retry."
         ) from err
 
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    temp_file.write(video_bytes)
-    temp_file.flush()
-    temp_file.close()
-
-    video_path = Path(temp_file.name)
+    # Index first, so the browser can start playing before the whole clip arrives.
+    video_path = save_bytes(faststart(video_bytes), ".mp4", prefix="veo-")
     return str(video_path), f"Saved result from `{VIDEO_MODEL}` to `{video_path.name}`."
 
 
+EXAMPLES = [
+    ["A timelapse of wildflowers blooming across a foggy valley at dawn, cinematic lighting."],
+    ["A cyberpunk street scene with neon reflections on wet pavement, steady cam dolly shot."],
+    ["An aerial shot soaring over snow-capped mountains toward a rising sun."],
+]
+# Part of every stored example's key: a new model renders the examples again.
+EXAMPLE_SETTINGS = {"model": VIDEO_MODEL}
+# Filled by `uv run python precompute_examples.py`; clicks on stored examples cost no quota.
+example_store = ExampleStore("step13.generate_video", generate_video, EXAMPLE_SETTINGS)
+
+
 with gr.Blocks(title="Gemini Video Generator") as demo:
     gr.Markdown(
         "## Gemini Video Generator\n"
@@ -108,18 +133,11 @@ with gr.Blocks(title="Gemini Video Generator") as demo:
     status_box = gr.Markdown(label="Status")
 
     gr.Examples(
-        examples=[
-            [
-                "A timelapse of wildflowers blooming across a foggy valley at dawn, cinematic lighting.",
-            ],
-            [
-                "A cyberpunk street scene with neon reflections on wet pavement, steady cam dolly shot.",
-            ],
-            [
-                "An aerial shot soaring over snow-capped mountains toward a rising sun.",
-            ],
-        ],
+        examples=EXAMPLES,
         inputs=[prompt_box],
+        outputs=[output_video, status_box],
+        fn=example_store.lookup(2),
+        run_on_click=True,
         label="Need ideas?",
     )
 
@@ -138,4 +156,5 @@ with gr.Blocks(title="Gemini Video Generator") as demo:
 
 
 if __name__ == "__main__":
-    demo.launch()
+    metrics.serve_from_env()
+    demo.launch(app_kwargs=cache_headers.app_kwargs())
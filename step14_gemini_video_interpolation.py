@@ -1,11 +1,10 @@
-"""Step 14: Morph between two images with Gemini Veo."""
+"""Step 14: Morph between two images with Gemini Veo, or render a storyboard of keyframes."""
 
-import io
 import os
-import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, List, Optional, Tuple
 
 import gradio as gr
 from dotenv import load_dotenv
@@ -13,6 +12,14 @@ from google import genai
 from google.genai import errors, types
 from PIL import Image
 
+import cache_headers
+import metrics
+import rate_limits
+import tracing
+from media_store import save_bytes
+from veo_frames import prepare_frames
+from video_tools import concat_videos, faststart
+
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -23,50 +30,54 @@ client = genai.Client(api_key=api_key)
 VIDEO_MODEL = "veo-3.1-generate-preview"
 POLL_SECONDS = 6
 MAX_POLLS = 30
-
-
-def _pil_to_part(image: Image.Image) -> types.Image:
-    """Convert a PIL image to a Gemini Image message."""
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    return types.Image(image_bytes=buffer.getvalue(), mime_type="image/png")
+ASPECT_CHOICES = ["16:9", "9:16"]
+RESOLUTION_CHOICES = ["720p", "1080p"]
+MAX_KEYFRAMES = 6
 
 
 def _wait_for_video(operation: types.GenerateVideosOperation) -> types.GenerateVideosOperation:
     """Poll the long-running operation until the video is ready or times out."""
     polls = 0
-    while not operation.done:
-        if polls >= MAX_POLLS:
-            raise gr.Error(
-                "Video generation is taking longer than expected. Please try again shortly."
-            )
-        time.sleep(POLL_SECONDS)
-        operation = client.operations.get(operation)
-        polls += 1
+    # The span's duration is the render time as seen from here (queue plus render on Veo's side).
+    with tracing.span("veo.wait_for_video", poll_seconds=POLL_SECONDS) as traced:
+        while not operation.done:
+            if polls >= MAX_POLLS:
+                raise gr.Error(
+                    "Video generation is taking longer than expected. Please try again shortly."
+                )
+            time.sleep(POLL_SECONDS)
+            poll_started = time.perf_counter()
+            operation = client.operations.get(operation)
+            traced.add("poll_overhead_ms", round((time.perf_counter() - poll_started) * 1000, 3))
+            polls += 1
+        traced.set("polls", polls)
     return operation
 
 
-def generate_transition(prompt: str, first_frame: Image.Image, last_frame: Image.Image) -> Tuple[str, str]:
-    """Blend between two uploaded frames and return the generated clip."""
-    prompt = prompt.strip()
-    if not prompt:
-        raise gr.Error("Describe the story you want Gemini to tell.")
-    if first_frame is None or last_frame is None:
-        raise gr.Error("Upload both a starting image and an ending image.")
-
-    start_image = _pil_to_part(first_frame)
-    end_image = _pil_to_part(last_frame)
-
+def _render_segment(
+    prompt: str,
+    start_image: types.Image,
+    end_image: types.Image,
+    aspect_ratio: str,
+    resolution: str,
+) -> bytes:
+    """Render one clip from `start_image` to `end_image` and return the MP4 bytes."""
     try:
-        operation = client.models.generate_videos(
-            model=VIDEO_MODEL,
-            source=types.GenerateVideosSource(
-                prompt=prompt,
-                image=start_image,
-            ),
-            config=types.GenerateVideosConfig(
-                last_frame=end_image,
+        operation = rate_limits.call(
+            VIDEO_MODEL,
+            lambda: client.models.generate_videos(
+                model=VIDEO_MODEL,
+                source=types.GenerateVideosSource(
+                    prompt=prompt,
+                    image=start_image,
+                ),
+                config=types.GenerateVideosConfig(
+                    aspect_ratio=aspect_ratio,
+                    resolution=resolution,
+                    last_frame=end_image,
+                ),
             ),
+            name="generate_videos",
         )
     except errors.ClientError as err:
         raise gr.Error(
@@ -91,18 +102,43 @@ def generate_transition(prompt: str, first_frame: Image.Image, last_frame: Image
         raise gr.Error("Gemini returned an empty video. Please try again.")
 
     try:
-        video_bytes = client.files.download(file=generated.video)
+        with tracing.span("files.download") as traced:
+            video_bytes = client.files.download(file=generated.video)
+            traced.set("bytes", len(video_bytes))
     except errors.ClientError as err:
         raise gr.Error(
             f"Gemini finished but downloading the video failed ({err.status}). Please retry."
         ) from err
+    return video_bytes
 
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    temp_file.write(video_bytes)
-    temp_file.flush()
-    temp_file.close()
 
-    video_path = Path(temp_file.name)
+def _check_resolution(aspect_ratio: str, resolution: str) -> None:
+    if resolution == "1080p" and aspect_ratio != "16:9":
+        raise gr.Error("1080p is only available when the aspect ratio is 16:9.")
+
+
+@tracing.traced("step14.generate_transition")
+def generate_transition(
+    prompt: str,
+    first_frame: Image.Image,
+    last_frame: Image.Image,
+    aspect_ratio: str = "16:9",
+    resolution: str = "720p",
+) -> Tuple[str, str]:
+    """Blend between two uploaded frames and return the generated clip."""
+    prompt = prompt.strip()
+    if not prompt:
+        raise gr.Error("Describe the story you want Gemini to tell.")
+    if first_frame is None or last_frame is None:
+        raise gr.Error("Upload both a starting image and an ending image.")
+    _check_resolution(aspect_ratio, resolution)
+
+    # Crop and scale both frames to the video size at the same time.
+    start_image, end_image = prepare_frames([first_frame, last_frame], aspect_ratio, resolution)
+    video_bytes = _render_segment(prompt, start_image, end_image, aspect_ratio, resolution)
+
+    # Index first, so the browser can start playing before the whole clip arrives.
+    video_path = save_bytes(faststart(video_bytes), ".mp4", prefix="veo-")
     status = (
         f"Saved morph from `{VIDEO_MODEL}` to `{video_path.name}`. "
         "Download the MP4 to keep the result."
@@ -110,6 +146,88 @@ def generate_transition(prompt: str, first_frame: Image.Image, last_frame: Image
     return str(video_path), status
 
 
+def order_keyframes(paths: Optional[List[str]]) -> List[str]:
+    """Keyframes are used in file-name order, e.g. 01.jpg, 02.jpg, 03.jpg."""
+    return sorted(paths or [], key=lambda path: Path(path).name.lower())
+
+
+def preview_keyframes(paths: Optional[List[str]]) -> List[Tuple[str, str]]:
+    """Show the keyframes numbered in the order they will be used."""
+    return [(path, f"{number}. {Path(path).name}") for number, path in enumerate(order_keyframes(paths), start=1)]
+
+
+def _segment_prompts(prompts_text: str, count: int) -> List[str]:
+    """One prompt per line; the last line also covers any remaining segments."""
+    lines = [line.strip() for line in prompts_text.splitlines() if line.strip()]
+    if not lines:
+        raise gr.Error("Describe at least one segment, one prompt per line.")
+    return [lines[min(index, len(lines) - 1)] for index in range(count)]
+
+
+@tracing.traced("step14.generate_storyboard", uploads=["keyframe_paths"])
+def generate_storyboard(
+    keyframe_paths: Optional[List[str]],
+    prompts_text: str,
+    aspect_ratio: str = "16:9",
+    resolution: str = "720p",
+) -> Iterator[Tuple[Optional[str], List[str], str]]:
+    """Render every pair of neighbouring keyframes at once and join the clips."""
+    keyframes = order_keyframes(keyframe_paths)
+    if len(keyframes) < 2:
+        raise gr.Error("Upload at least two keyframes.")
+    if len(keyframes) > MAX_KEYFRAMES:
+        raise gr.Error(f"Use at most {MAX_KEYFRAMES} keyframes.")
+    _check_resolution(aspect_ratio, resolution)
+    segment_count = len(keyframes) - 1
+    prompts = _segment_prompts(prompts_text, segment_count)
+
+    images = []
+    for number, path in enumerate(keyframes, start=1):
+        try:
+            with Image.open(path) as img:
+                images.append(img.convert("RGB"))
+        except (OSError, Image.DecompressionBombError) as exc:
+            raise gr.Error(f"Keyframe {number} ({Path(path).name}) does not look like an image.") from exc
+    frames = prepare_frames(images, aspect_ratio, resolution)
+
+    yield None, [], f"Rendering {segment_count} segments in parallel…"
+    segment_paths: List[Optional[str]] = [None] * segment_count
+    failures = []
+    with ThreadPoolExecutor(max_workers=segment_count) as pool:
+        futures = {
+            pool.submit(
+                _render_segment,
+                prompts[index],
+                frames[index],
+                frames[index + 1],
+                aspect_ratio,
+                resolution,
+            ): index
+            for index in range(segment_count)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                segment_paths[index] = str(save_bytes(faststart(future.result()), ".mp4", prefix="veo-segment-"))
+            except Exception as err:
+                failures.append(f"Segment {index + 1}: {getattr(err, 'message', err)}")
+            ready = [path for path in segment_paths if path]
+            yield None, ready, f"{len(ready)} of {segment_count} segments ready."
+
+    if failures:
+        raise gr.Error("Some segments failed. " + " ".join(failures))
+
+    clips = [path for path in segment_paths if path]
+    stitched = concat_videos(clips)
+    if stitched is None:
+        yield None, clips, (
+            f"Rendered {segment_count} segments. Joining them needs ffmpeg and matching clips, "
+            "so download the segments below instead."
+        )
+        return
+    yield str(stitched), clips, f"Joined {segment_count} segments from `{VIDEO_MODEL}` without re-encoding."
+
+
 with gr.Blocks(title="Gemini Image-to-Video Transition") as demo:
     gr.Markdown(
         "## Gemini Image-to-Video Transition\n"
@@ -117,54 +235,90 @@ with gr.Blocks(title="Gemini Image-to-Video Transition") as demo:
         "Gemini Veo will create a clip that bridges the two images."
     )
 
-    prompt_box = gr.Textbox(
-        label="Video prompt",
-        lines=4,
-        placeholder="Example: A ghostly figure fades from the swing as mist thickens in the moonlight.",
-    )
-
     with gr.Row():
-        first_image = gr.Image(
-            type="pil",
-            label="Starting image",
-            image_mode="RGB",
-        )
-        last_image = gr.Image(
-            type="pil",
-            label="Ending image",
-            image_mode="RGB",
+        aspect_choice = gr.Radio(ASPECT_CHOICES, value="16:9", label="Aspect ratio")
+        resolution_choice = gr.Radio(RESOLUTION_CHOICES, value="720p", label="Resolution")
+
+    with gr.Tab("Transition"):
+        prompt_box = gr.Textbox(
+            label="Video prompt",
+            lines=4,
+            placeholder="Example: A ghostly figure fades from the swing as mist thickens in the moonlight.",
         )
 
-    generate_button = gr.Button("Generate Transition", variant="primary")
-    reset_button = gr.Button("Start Over")
+        with gr.Row():
+            first_image = gr.Image(
+                type="pil",
+                label="Starting image",
+                image_mode="RGB",
+            )
+            last_image = gr.Image(
+                type="pil",
+                label="Ending image",
+                image_mode="RGB",
+            )
+
+        generate_button = gr.Button("Generate Transition", variant="primary")
+        reset_button = gr.Button("Start Over")
 
-    output_video = gr.Video(label="Generated transition")
-    status_box = gr.Markdown(label="Status")
+        output_video = gr.Video(label="Generated transition")
+        status_box = gr.Markdown(label="Status")
 
-    gr.Examples(
-        examples=[
-            [
-                "A cinematic, haunting transition where a spirit dissolves into mist beneath an ancient tree.",
+        gr.Examples(
+            examples=[
+                [
+                    "A cinematic, haunting transition where a spirit dissolves into mist beneath an ancient tree.",
+                ],
             ],
-        ],
-        inputs=[prompt_box],
-        label="Need a prompt?",
-    )
+            inputs=[prompt_box],
+            label="Need a prompt?",
+        )
+
+    with gr.Tab("Storyboard"):
+        gr.Markdown(
+            "Upload up to six keyframes named in order (01.jpg, 02.jpg, …) and write one prompt per "
+            "segment. All segments render at the same time and are joined into one clip."
+        )
+        with gr.Row():
+            keyframe_files = gr.File(
+                label="Keyframes",
+                file_count="multiple",
+                file_types=["image"],
+                type="filepath",
+            )
+            keyframe_gallery = gr.Gallery(label="Order", columns=3, height=240, interactive=False)
+        segment_prompts_box = gr.Textbox(
+            label="Segment prompts (one line per segment)",
+            lines=5,
+            placeholder="Dawn light creeps over the city skyline.\nThe camera glides down to a busy street market.",
+        )
+        storyboard_button = gr.Button("Render Storyboard", variant="primary")
+        storyboard_video = gr.Video(label="Storyboard")
+        segment_files = gr.File(label="Segments", file_count="multiple")
+        storyboard_status = gr.Markdown(label="Status")
 
     generate_button.click(
         generate_transition,
-        inputs=[prompt_box, first_image, last_image],
+        inputs=[prompt_box, first_image, last_image, aspect_choice, resolution_choice],
         outputs=[output_video, status_box],
         show_progress=True,
     )
 
     reset_button.click(
-        lambda: ("", None, None, None, ""),
+        lambda: ("", None, None, "16:9", "720p", None, ""),
         inputs=[],
-        outputs=[prompt_box, first_image, last_image, output_video, status_box],
+        outputs=[prompt_box, first_image, last_image, aspect_choice, resolution_choice, output_video, status_box],
         queue=False,
     )
 
+    keyframe_files.change(preview_keyframes, inputs=keyframe_files, outputs=keyframe_gallery, queue=False)
+    storyboard_button.click(
+        generate_storyboard,
+        inputs=[keyframe_files, segment_prompts_box, aspect_choice, resolution_choice],
+        outputs=[storyboard_video, segment_files, storyboard_status],
+    )
+
 
 if __name__ == "__main__":
-    demo.launch()
+    metrics.serve_from_env()
+    demo.launch(app_kwargs=cache_headers.app_kwargs())
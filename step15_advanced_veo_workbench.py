@@ -1,11 +1,19 @@
 """Step 15: Marketing video studio for Veo with brand and persona controls."""
 
-import io
+import contextvars
+import csv
+import inspect
+import json
 import os
 import tempfile
 import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import gradio as gr
 from dotenv import load_dotenv
@@ -13,6 +21,18 @@ from google import genai
 from google.genai import errors, types
 from PIL import Image
 
+import cache_headers
+import metrics
+import model_routing
+import rate_limits
+import tracing
+from brief_template import craft_js, render_prompt
+from example_store import ExampleStore
+from media_store import save_bytes
+from state_backend import get_backend
+from veo_frames import prepare_frame
+from video_tools import faststart
+
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -21,10 +41,18 @@ if not api_key:
 client = genai.Client(api_key=api_key)
 
 DEFAULT_MODEL = "veo-3.1-generate-preview"
+FAST_MODEL = "veo-3.1-fast-generate-preview"
+AUTO_MODEL = "auto (fast model when Veo is slow)"
 MODEL_CHOICES = [
     "veo-3.1-generate-preview",
     "veo-3.1-fast-generate-preview",
+    AUTO_MODEL,
 ]
+RENDER_SLO_SECONDS = 150
+# google.rpc codes of failed Veo operations that count against the model in
+# auto mode (deadline exceeded, resource exhausted, internal, unavailable);
+# other codes, such as a rejected prompt, say nothing about the model.
+MODEL_FAILURE_CODES = {4, 8, 13, 14}
 ASPECT_CHOICES = ["16:9", "9:16"]
 RESOLUTION_CHOICES = ["720p", "1080p"]
 PERSON_CHOICES = ["auto", "allow_adult", "allow_all", "dont_allow"]
@@ -39,14 +67,29 @@ CAMPAIGN_GOALS = [
 DEFAULT_NEGATIVE = "low quality, jitter, unreadable text overlays, oversaturated colors, warped faces"
 MAX_POLLS = 40
 POLL_SECONDS = 6
-
-
-def _pil_to_part(image: Optional[Image.Image]) -> Optional[types.Image]:
-    if image is None:
-        return None
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    return types.Image(image_bytes=buffer.getvalue(), mime_type="image/png")
+JOBS_NAMESPACE = "step15_jobs"
+# Job rows are dropped when their tab closes, or after this long at the latest.
+JOB_TTL_SECONDS = 24 * 60 * 60
+# Bulk imports: renders at the same time, and briefs per file.
+BATCH_WORKERS = 2
+MAX_BATCH_BRIEFS = 100
+# Build the prompt preview in the browser from the shared template in
+# brief_template.py; set STEP15_CRAFT_IN_BROWSER=0 to use the server instead.
+CRAFT_IN_BROWSER = os.getenv("STEP15_CRAFT_IN_BROWSER", "1") != "0"
+
+# Render status lives outside the process so any worker can report it.
+backend = get_backend()
+
+# Used when the user picks AUTO_MODEL: renders move to the fast model while the
+# standard model misses RENDER_SLO_SECONDS or keeps failing.
+video_router = model_routing.ModelRouter(
+    DEFAULT_MODEL,
+    [FAST_MODEL],
+    latency_slo=RENDER_SLO_SECONDS,
+    min_samples=3,
+    window=20,
+    probe_seconds=600,
+)
 
 
 def _validate_resolution(aspect: str, resolution: str) -> None:
@@ -62,18 +105,68 @@ def _cleanup_person_value(value: str) -> Optional[str]:
 
 def _wait_for_video(operation: types.GenerateVideosOperation) -> types.GenerateVideosOperation:
     polls = 0
-    while not operation.done:
-        if polls >= MAX_POLLS:
-            raise gr.Error(
-                "Video generation is taking longer than expected. "
-                "Try a shorter prompt or switch to the fast model."
-            )
-        time.sleep(POLL_SECONDS)
-        operation = client.operations.get(operation)
-        polls += 1
+    # The span's duration is the render time as seen from here (queue plus render on Veo's side).
+    with tracing.span("veo.wait_for_video", poll_seconds=POLL_SECONDS) as traced:
+        while not operation.done:
+            if polls >= MAX_POLLS:
+                raise gr.Error(
+                    "Video generation is taking longer than expected. "
+                    "Try a shorter prompt or switch to the fast model."
+                )
+            time.sleep(POLL_SECONDS)
+            poll_started = time.perf_counter()
+            operation = client.operations.get(operation)
+            traced.add("poll_overhead_ms", round((time.perf_counter() - poll_started) * 1000, 3))
+            polls += 1
+        traced.set("polls", polls)
     return operation
 
 
+@contextmanager
+def _track_job(session: str, summary: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Record a render in the shared state backend while it runs.
+
+    The job's status and result then outlive the server process that started
+    it, for example across a restart.
+    """
+    _prune_jobs()
+    key = f"{session}:{time.time():.0f}-{uuid.uuid4().hex[:8]}"
+    job: Dict[str, Any] = {**summary, "status": "rendering", "started": time.time()}
+    backend.set(JOBS_NAMESPACE, key, job)
+    try:
+        yield job
+    except Exception as err:
+        message = str(err) if isinstance(err, gr.Error) else f"{type(err).__name__}: {err}"
+        job.update(status="failed", message=message, finished=time.time())
+        backend.set(JOBS_NAMESPACE, key, job)
+        raise
+    job.update(status="done", finished=time.time())
+    backend.set(JOBS_NAMESPACE, key, job)
+
+
+def _prune_jobs() -> None:
+    """Delete jobs older than JOB_TTL_SECONDS, including ones whose worker died."""
+    cutoff = time.time() - JOB_TTL_SECONDS
+    for key, job in backend.scan(JOBS_NAMESPACE):
+        if job.get("started", 0) < cutoff:
+            backend.delete(JOBS_NAMESPACE, key)
+
+
+def forget_jobs(request: gr.Request) -> None:
+    """Drop the session's job rows when the browser tab closes."""
+    for key, _ in backend.scan(JOBS_NAMESPACE, prefix=f"{request.session_hash}:"):
+        backend.delete(JOBS_NAMESPACE, key)
+
+
+def list_jobs(request: gr.Request) -> List[List[str]]:
+    """Return this session's renders, newest first, for the status table."""
+    rows = []
+    for _, job in reversed(backend.scan(JOBS_NAMESPACE, prefix=f"{request.session_hash}:")):
+        started = time.strftime("%H:%M:%S", time.localtime(job["started"]))
+        rows.append([started, job["status"], job.get("model", ""), job.get("video", "")])
+    return rows
+
+
 def build_prompt(
     brand_name: str,
     brand_voice: str,
@@ -89,65 +182,23 @@ def build_prompt(
     extra_notes: str,
     duration_seconds: int,
 ) -> str:
-    brand_name = brand_name.strip()
-    brand_voice = brand_voice.strip()
-    persona_title = persona_title.strip()
-    persona_details = persona_details.strip()
-    campaign_goal = campaign_goal.strip()
-    custom_goal = custom_goal.strip()
-    product_highlights = product_highlights.strip()
-    differentiators = differentiators.strip()
-    call_to_action = call_to_action.strip()
-    visual_style = visual_style.strip()
-    audio_direction = audio_direction.strip()
-    extra_notes = extra_notes.strip()
-
-    objective = custom_goal or campaign_goal
-
-    parts = []
-    if brand_name:
-        parts.append(
-            f"Produce a {duration_seconds}-second marketing video for {brand_name}."
-        )
-    else:
-        parts.append(f"Produce a {duration_seconds}-second marketing video.")
-
-    if objective:
-        parts.append(f"Campaign objective: {objective}.")
-
-    if persona_title or persona_details:
-        persona_lines = ["Target viewer:"]
-        if persona_title:
-            persona_lines.append(persona_title)
-        if persona_details:
-            persona_lines.append(persona_details)
-        parts.append(" ".join(persona_lines))
-
-    if product_highlights:
-        parts.append(f"Showcase these key messages or offers: {product_highlights}.")
-
-    if differentiators:
-        parts.append(f"Brand differentiators to reinforce: {differentiators}.")
-
-    if brand_voice:
-        parts.append(f"Maintain a brand voice that is {brand_voice}.")
-
-    if visual_style:
-        parts.append(f"Visual direction and cinematography: {visual_style}.")
-
-    if audio_direction:
-        parts.append(f"Audio direction (music, ambience, dialogue cues): {audio_direction}.")
-
-    if call_to_action:
-        parts.append(f"End with a clear call-to-action: {call_to_action}.")
-
-    if extra_notes:
-        parts.append(f"Additional guidance: {extra_notes}.")
-
-    parts.append("Include naturalistic motion and keep logos or on-screen text sharp and legible.")
-    parts.append("Deliver a cohesive narrative arc that hooks the viewer in the opening seconds.")
-
-    return "\n".join(parts)
+    return render_prompt(
+        {
+            "brand_name": brand_name,
+            "brand_voice": brand_voice,
+            "persona_title": persona_title,
+            "persona_details": persona_details,
+            "campaign_goal": campaign_goal,
+            "custom_goal": custom_goal,
+            "product_highlights": product_highlights,
+            "differentiators": differentiators,
+            "call_to_action": call_to_action,
+            "visual_style": visual_style,
+            "audio_direction": audio_direction,
+            "extra_notes": extra_notes,
+            "duration_seconds": duration_seconds,
+        }
+    )
 
 
 def craft_brief(
@@ -186,6 +237,7 @@ def craft_brief(
     return prompt_text, negative_prompt
 
 
+@tracing.traced("step15.advanced_generate")
 def advanced_generate(
     model: str,
     brand_name: str,
@@ -210,6 +262,9 @@ def advanced_generate(
     enhance_prompt: bool,
     person_generation: str,
     seed_text: str,
+    request: gr.Request,
+    *,
+    priority: int = rate_limits.INTERACTIVE,
 ) -> Tuple[str, str]:
     _validate_resolution(aspect_ratio, resolution)
 
@@ -233,7 +288,10 @@ def advanced_generate(
     if not prompt_text:
         raise gr.Error("Add enough campaign details to craft a prompt.")
 
-    start_image = _pil_to_part(reference_image)
+    # Cropped and scaled to the render size; cached, so a new seed skips this.
+    start_image = None
+    if reference_image is not None:
+        start_image = prepare_frame(reference_image, aspect_ratio, resolution)
     negative_prompt = negative_prompt.strip() or None
     person_value = _cleanup_person_value(person_generation)
 
@@ -247,6 +305,11 @@ def advanced_generate(
 
     source = types.GenerateVideosSource(prompt=prompt_text, image=start_image) if start_image else None
 
+    auto_routed = model == AUTO_MODEL
+    if auto_routed:
+        model = video_router.choose()
+    render_started = time.monotonic()
+
     config = types.GenerateVideosConfig(
         aspect_ratio=aspect_ratio,
         resolution=resolution,
@@ -258,53 +321,75 @@ def advanced_generate(
         seed=seed,
     )
 
-    try:
-        operation = client.models.generate_videos(
-            model=model,
-            prompt=None if source else prompt_text,
-            source=source,
-            config=config,
-        )
-    except errors.ClientError as err:
-        raise gr.Error(
-            f"Gemini video generation failed ({err.status}). "
-            f"{err.message} Ensure your account has access to {model}."
-        ) from err
-
-    operation = _wait_for_video(operation)
-
-    if operation.error:
-        raise gr.Error(operation.error.get("message", "Veo returned an unknown error."))
-
-    response = operation.response or operation.result
-    videos = response.generated_videos if response else None
-    if not videos:
-        raise gr.Error("Gemini did not return a video. Try refining your brief or settings.")
-
-    generated = videos[0]
-    if generated.video is None:
-        raise gr.Error("Gemini returned an empty video. Please try again.")
+    job_summary = {"brand": brand_name.strip(), "model": model, "prompt": prompt_text}
+    with _track_job(request.session_hash, job_summary) as job:
+        try:
+            # The router judges Veo from the moment the rate limiter lets the request go.
+            with rate_limits.slot_timer() as slots:
+                operation = rate_limits.call(
+                    model,
+                    lambda: client.models.generate_videos(
+                        model=model,
+                        prompt=None if source else prompt_text,
+                        source=source,
+                        config=config,
+                    ),
+                    priority=priority,
+                    name="generate_videos",
+                )
+        except errors.APIError as err:
+            if auto_routed and video_router.is_model_failure(err):
+                video_router.record(model, video_router.elapsed(render_started, slots), ok=False)
+            raise gr.Error(
+                f"Gemini video generation failed ({err.status}). "
+                f"{err.message} Ensure your account has access to {model}."
+            ) from err
 
-    try:
-        video_bytes = client.files.download(file=generated.video)
-    except errors.ClientError as err:
-        raise gr.Error(
-            f"Gemini finished but downloading the video failed ({err.status}). "
-            "Please retry."
-        ) from err
+        try:
+            operation = _wait_for_video(operation)
+        except (gr.Error, errors.APIError) as err:
+            # A polling timeout (gr.Error) or a server error while polling.
+            if auto_routed and (isinstance(err, gr.Error) or video_router.is_model_failure(err)):
+                video_router.record(model, video_router.elapsed(render_started, slots), ok=False)
+            raise
+
+        if auto_routed:
+            code = operation.error.get("code") if operation.error else None
+            if not operation.error or code in MODEL_FAILURE_CODES:
+                ok = not operation.error
+                video_router.record(model, video_router.elapsed(render_started, slots), ok=ok)
+
+        if operation.error:
+            raise gr.Error(operation.error.get("message", "Veo returned an unknown error."))
+
+        response = operation.response or operation.result
+        videos = response.generated_videos if response else None
+        if not videos:
+            raise gr.Error("Gemini did not return a video. Try refining your brief or settings.")
+
+        generated = videos[0]
+        if generated.video is None:
+            raise gr.Error("Gemini returned an empty video. Please try again.")
 
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    temp_file.write(video_bytes)
-    temp_file.flush()
-    temp_file.close()
+        try:
+            with tracing.span("files.download") as traced:
+                video_bytes = client.files.download(file=generated.video)
+                traced.set("bytes", len(video_bytes))
+        except errors.ClientError as err:
+            raise gr.Error(
+                f"Gemini finished but downloading the video failed ({err.status}). "
+                "Please retry."
+            ) from err
 
-    video_path = Path(temp_file.name)
+        # Index first, so the browser can start playing before the whole clip arrives.
+        video_path = save_bytes(faststart(video_bytes), ".mp4", prefix="veo-")
+        job.update(model=model, video=str(video_path))
 
     descriptors = [
         f"**Brand:** {brand_name or '—'}",
         f"**Persona:** {persona_title or '—'}",
         f"**Goal:** {(custom_goal or campaign_goal or '—')}",
-        f"**Model:** `{model}`",
+        f"**Model:** `{model}`" + (" (auto-routed)" if auto_routed else ""),
         f"**Aspect:** {aspect_ratio}",
         f"**Resolution:** {resolution}",
         f"**Duration:** {duration_seconds}s",
@@ -327,6 +412,221 @@ def advanced_generate(
     return str(video_path), status
 
 
+EXAMPLES = [
+    [
+        "Nimbus Bikes",
+        "Energetic, witty, city-smart",
+        "Young urban commuter, values time savings",
+        "Works downtown, wants to ditch gridlock while looking stylish and sustainable.",
+        "Product launch awareness",
+        "",
+        "Highlight 5x faster commute, regenerative braking, concierge maintenance.",
+        "Only bike with adaptive lighting + theft recovery service.",
+        "Tap to book a free downtown test ride.",
+        "Dynamic sunrise shots weaving through traffic, neon accents, kinetic typography on benefits.",
+        "Voiceover from excited rider, subtle city ambience, upbeat electronic score.",
+        "",
+    ],
+    [
+        "Pulse Fuel",
+        "Confident, expert, high-performance coach",
+        "Endurance athlete juggling family & training",
+        "Needs energy that is clean, science-backed, and portable.",
+        "Lead generation",
+        "",
+        "Clinically proven electrolyte ratio, zero sugar, designed by sports scientists.",
+        "Trusted by national triathlon team, NSF certified, smoother gut profile.",
+        "Claim your performance starter pack.",
+        "Split-screen of training visuals + product close-ups, bold kinetic infographics, warm sunrise palette.",
+        "Pulse-like synth beats, heartbeat SFX transitions, coach whispers 'power your breakthrough'.",
+        "Mention limited-time coach Q&A webinar registration.",
+    ],
+]
+# Sample briefs render with the default model controls below.
+EXAMPLE_SETTINGS = {
+    "model": DEFAULT_MODEL,
+    "aspect_ratio": "16:9",
+    "resolution": "720p",
+    "duration_seconds": 8,
+    "generate_audio": True,
+    "enhance_prompt": True,
+    "person_generation": "auto",
+}
+
+
+def render_example(*brief: str) -> Tuple[str, str]:
+    """Render one sample brief with EXAMPLE_SETTINGS (used by precompute_examples.py)."""
+    settings = EXAMPLE_SETTINGS
+    return advanced_generate(
+        settings["model"],
+        *brief,
+        "",
+        None,
+        "",
+        settings["aspect_ratio"],
+        settings["resolution"],
+        settings["duration_seconds"],
+        settings["generate_audio"],
+        settings["enhance_prompt"],
+        settings["person_generation"],
+        "",
+        SimpleNamespace(session_hash="examples"),
+    )
+
+
+# Filled by `uv run python precompute_examples.py`; clicks on stored examples cost no quota.
+example_store = ExampleStore("step15.advanced_generate", render_example, EXAMPLE_SETTINGS)
+
+# Columns of a bulk import: the build_prompt fields plus per-brief render options.
+BRIEF_FIELDS = list(inspect.signature(build_prompt).parameters)
+BRIEF_COLUMNS = BRIEF_FIELDS + ["negative_prompt", "seed"]
+BATCH_HEADERS = ["row", "brand", "status", "video", "prompt or message"]
+
+
+def read_briefs(path: str) -> List[Dict[str, Any]]:
+    """Load briefs from a CSV file or a JSONL file with one object per line."""
+    file = Path(path)
+    try:
+        if file.suffix.lower() in {".jsonl", ".ndjson"}:
+            lines = file.read_text(encoding="utf-8-sig").splitlines()
+            rows = [json.loads(line) for line in lines if line.strip()]
+        else:
+            with file.open(newline="", encoding="utf-8-sig") as handle:
+                rows = list(csv.DictReader(handle))
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error) as exc:
+        raise gr.Error(f"Could not read {file.name}: {exc}") from exc
+
+    if not rows:
+        raise gr.Error("The file does not contain any briefs.")
+    if not all(isinstance(row, dict) for row in rows):
+        raise gr.Error("Each JSONL line must be an object with brief fields.")
+    if len(rows) > MAX_BATCH_BRIEFS:
+        raise gr.Error(
+            f"Import at most {MAX_BATCH_BRIEFS} briefs at a time; this file has {len(rows)}."
+        )
+    unknown = sorted({str(column) for row in rows for column in row} - set(BRIEF_COLUMNS))
+    if unknown:
+        raise gr.Error(f"Unknown columns: {', '.join(unknown)}. Use any of: {', '.join(BRIEF_COLUMNS)}.")
+    return rows
+
+
+def _brief_values(row: Dict[str, Any], default_duration: int) -> Dict[str, Any]:
+    """Return every column of one brief as a clean string, and its duration as an int."""
+    brief = {name: str(row.get(name) or "").strip() for name in BRIEF_COLUMNS}
+    brief["campaign_goal"] = brief["campaign_goal"] or CAMPAIGN_GOALS[0]
+    brief["negative_prompt"] = brief["negative_prompt"] or DEFAULT_NEGATIVE
+    try:
+        duration = int(float(brief["duration_seconds"] or default_duration))
+    except ValueError:
+        duration = 0
+    if not 4 <= duration <= 8:
+        raise ValueError("duration_seconds must be a whole number from 4 to 8.")
+    brief["duration_seconds"] = duration
+    return brief
+
+
+def _write_batch_results(table: List[List[Any]], results_path: Path) -> None:
+    with results_path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(BATCH_HEADERS)
+        writer.writerows(table)
+
+
+@tracing.traced("step15.render_batch", uploads=["briefs_file"])
+def render_batch(
+    briefs_file: Optional[str],
+    model: str,
+    aspect_ratio: str,
+    resolution: str,
+    duration_seconds: int,
+    generate_audio: bool,
+    enhance_prompt: bool,
+    person_generation: str,
+    request: gr.Request,
+) -> Iterator[Tuple[List[List[Any]], List[str]]]:
+    """Render every brief of an uploaded CSV or JSONL file and stream a status table.
+
+    All prompts are assembled first, so invalid rows show up before any quota
+    is spent. Up to BATCH_WORKERS renders run at a time, at batch priority in
+    the shared rate limiter, so interactive renders go first. Each render is
+    also listed under "My renders".
+    """
+    if not briefs_file:
+        raise gr.Error("Upload a CSV or JSONL file of campaign briefs.")
+    _validate_resolution(aspect_ratio, resolution)
+    rows = read_briefs(briefs_file)
+
+    table: List[List[Any]] = []
+    briefs: Dict[int, Dict[str, Any]] = {}
+    for index, row in enumerate(rows):
+        brand = str(row.get("brand_name") or "").strip()
+        try:
+            brief = _brief_values(row, duration_seconds)
+        except ValueError as err:
+            table.append([index + 1, brand, "invalid", "", str(err)])
+            continue
+        brief["prompt"] = render_prompt({name: brief[name] for name in BRIEF_FIELDS})
+        briefs[index] = brief
+        table.append([index + 1, brand, "queued", "", brief["prompt"]])
+
+    workdir = Path(tempfile.mkdtemp(prefix="step15-batch-"))
+    results_path = workdir / "results.csv"
+    _write_batch_results(table, results_path)
+    yield table, [str(results_path)]
+
+    def render(brief: Dict[str, Any]) -> str:
+        video_path, _ = advanced_generate(
+            model,
+            **{name: brief[name] for name in BRIEF_FIELDS},
+            prompt_override=brief["prompt"],
+            reference_image=None,
+            negative_prompt=brief["negative_prompt"],
+            aspect_ratio=aspect_ratio,
+            resolution=resolution,
+            generate_audio=generate_audio,
+            enhance_prompt=enhance_prompt,
+            person_generation=person_generation,
+            seed_text=brief["seed"],
+            request=SimpleNamespace(session_hash=request.session_hash),
+            priority=rate_limits.BATCH,
+        )
+        return video_path
+
+    videos: Dict[int, Path] = {}
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+        pending: Dict[Future, int] = {
+            pool.submit(contextvars.copy_context().run, render, brief): index
+            for index, brief in briefs.items()
+        }
+        for index in briefs:
+            table[index][2] = "rendering"
+        yield table, [str(results_path)]
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    video = Path(future.result())
+                except Exception as err:  # one failed brief must not stop the others
+                    message = str(err) if isinstance(err, gr.Error) else f"{type(err).__name__}: {err}"
+                    table[index][2:] = ["failed", "", message]
+                    continue
+                videos[index] = video
+                table[index][2:4] = ["done", video.name]
+            _write_batch_results(table, results_path)
+            yield table, [str(results_path)]
+
+    downloads = [str(results_path)]
+    if videos:
+        archive_path = workdir / "videos.zip"
+        # MP4 is already compressed; store the clips as they are.
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for index, video in sorted(videos.items()):
+                archive.write(video, f"row{index + 1:03d}-{video.name}")
+        downloads.append(str(archive_path))
+    yield table, downloads
+
+
 with gr.Blocks(title="Marketing Video Studio for Veo") as demo:
     gr.Markdown(
         "## Marketing Video Studio for Veo\n"
@@ -441,6 +741,22 @@ with gr.Blocks(title="Marketing Video Studio for Veo") as demo:
             placeholder=DEFAULT_NEGATIVE,
         )
 
+    with gr.Tab("Bulk Briefs"):
+        gr.Markdown(
+            "Render a whole spreadsheet of briefs with the settings on the Model Controls tab. Upload a CSV or "
+            "JSONL file with any of these columns: "
+            + ", ".join(f"`{column}`" for column in BRIEF_COLUMNS)
+            + ". Empty `duration_seconds` uses the clip length slider."
+        )
+        briefs_file = gr.File(
+            label="Briefs (CSV or JSONL)",
+            file_types=[".csv", ".jsonl", ".ndjson"],
+            type="filepath",
+        )
+        batch_button = gr.Button("Render All Briefs", variant="primary")
+        batch_table = gr.Dataframe(headers=BATCH_HEADERS, label="Briefs", wrap=True, interactive=False)
+        batch_downloads = gr.File(label="Download results (CSV and videos)", file_count="multiple")
+
     craft_button = gr.Button("Craft Marketing Prompt", variant="secondary")
     prompt_preview = gr.Textbox(
         label="Assembled Veo prompt",
@@ -455,37 +771,16 @@ with gr.Blocks(title="Marketing Video Studio for Veo") as demo:
     output_video = gr.Video(label="Generated video")
     status_box = gr.Markdown(label="Status & settings")
 
+    with gr.Accordion("My renders", open=False):
+        jobs_table = gr.Dataframe(
+            headers=["started", "status", "model", "video"],
+            label="Renders in this session",
+            interactive=False,
+        )
+        refresh_jobs_button = gr.Button("Refresh")
+
     gr.Examples(
-        examples=[
-            [
-                "Nimbus Bikes",
-                "Energetic, witty, city-smart",
-                "Young urban commuter, values time savings",
-                "Works downtown, wants to ditch gridlock while looking stylish and sustainable.",
-                "Product launch awareness",
-                "",
-                "Highlight 5x faster commute, regenerative braking, concierge maintenance.",
-                "Only bike with adaptive lighting + theft recovery service.",
-                "Tap to book a free downtown test ride.",
-                "Dynamic sunrise shots weaving through traffic, neon accents, kinetic typography on benefits.",
-                "Voiceover from excited rider, subtle city ambience, upbeat electronic score.",
-                "",
-            ],
-            [
-                "Pulse Fuel",
-                "Confident, expert, high-performance coach",
-                "Endurance athlete juggling family & training",
-                "Needs energy that is clean, science-backed, and portable.",
-                "Lead generation",
-                "",
-                "Clinically proven electrolyte ratio, zero sugar, designed by sports scientists.",
-                "Trusted by national triathlon team, NSF certified, smoother gut profile.",
-                "Claim your performance starter pack.",
-                "Split-screen of training visuals + product close-ups, bold kinetic infographics, warm sunrise palette.",
-                "Pulse-like synth beats, heartbeat SFX transitions, coach whispers 'power your breakthrough'.",
-                "Mention limited-time coach Q&A webinar registration.",
-            ],
-        ],
+        examples=EXAMPLES,
         inputs=[
             brand_name,
             brand_voice,
@@ -500,30 +795,42 @@ with gr.Blocks(title="Marketing Video Studio for Veo") as demo:
             audio_direction,
             extra_notes,
         ],
+        outputs=[output_video, status_box],
+        fn=example_store.lookup(2),
+        run_on_click=True,
         label="Load sample briefs",
     )
 
-    craft_button.click(
-        craft_brief,
-        inputs=[
-            brand_name,
-            brand_voice,
-            persona_title,
-            persona_details,
-            campaign_goal,
-            custom_goal,
-            product_highlights,
-            differentiators,
-            call_to_action,
-            visual_style,
-            audio_direction,
-            extra_notes,
-            negative_prompt_box,
-            duration_slider,
-        ],
-        outputs=[prompt_preview, negative_prompt_box],
-        show_progress=False,
-    )
+    craft_inputs = [
+        brand_name,
+        brand_voice,
+        persona_title,
+        persona_details,
+        campaign_goal,
+        custom_goal,
+        product_highlights,
+        differentiators,
+        call_to_action,
+        visual_style,
+        audio_direction,
+        extra_notes,
+        negative_prompt_box,
+        duration_slider,
+    ]
+    if CRAFT_IN_BROWSER:
+        craft_button.click(
+            None,
+            inputs=craft_inputs,
+            outputs=[prompt_preview, negative_prompt_box],
+            js=craft_js(list(inspect.signature(craft_brief).parameters), DEFAULT_NEGATIVE),
+        )
+    else:
+        craft_button.click(
+            craft_brief,
+            inputs=craft_inputs,
+            outputs=[prompt_preview, negative_prompt_box],
+            show_progress=False,
+        )
 
     generate_button.click(
         advanced_generate,
@@ -555,6 +862,22 @@ with gr.Blocks(title="Marketing Video Studio for Veo") as demo:
         outputs=[output_video, status_box],
         show_progress=True,
     )
+    batch_button.click(
+        render_batch,
+        inputs=[
+            briefs_file,
+            model_choice,
+            aspect_choice,
+            resolution_choice,
+            duration_slider,
+            audio_toggle,
+            enhance_toggle,
+            person_dropdown,
+        ],
+        outputs=[batch_table, batch_downloads],
+    )
+    refresh_jobs_button.click(list_jobs, inputs=[], outputs=jobs_table, queue=False)
+    demo.unload(forget_jobs)
 
     reset_button.click(
         lambda: (
@@ -616,4 +939,5 @@ with gr.Blocks(title="Marketing Video Studio for Veo") as demo:
 
 
 if __name__ == "__main__":
-    demo.launch()
+    metrics.serve_from_env()
+    demo.launch(app_kwargs=cache_headers.app_kwargs())
@@ -0,0 +1,104 @@
+"""The browser and Python prompt builders must produce the same prompt.
+
+Runs the `js` function from `craft_js` under Node.js and compares it with
+`render_prompt`. Skipped when `node` is not installed.
+
+    uv run python -m unittest discover tests
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from brief_template import craft_js, render_prompt  # noqa: E402
+
+
+# The inputs of step15's "Craft prompt" button, in order (craft_brief's parameters).
+INPUT_NAMES = [
+    "brand_name",
+    "brand_voice",
+    "persona_title",
+    "persona_details",
+    "campaign_goal",
+    "custom_goal",
+    "product_highlights",
+    "differentiators",
+    "call_to_action",
+    "visual_style",
+    "audio_direction",
+    "extra_notes",
+    "negative_prompt",
+    "duration_seconds",
+]
+DEFAULT_NEGATIVE = "low quality"
+
+FULL_BRIEF = {
+    "brand_name": "Nimbus Bikes",
+    "brand_voice": "Energetic, witty",
+    "persona_title": "Urban commuter",
+    "persona_details": "Wants to ditch gridlock.",
+    "campaign_goal": "Product launch awareness",
+    "custom_goal": "",
+    "product_highlights": "5x faster commute",
+    "differentiators": "Adaptive lighting",
+    "call_to_action": "Book a test ride.",
+    "visual_style": "Sunrise shots, neon accents",
+    "audio_direction": "Upbeat electronic score",
+    "extra_notes": "",
+    "negative_prompt": "",
+    "duration_seconds": 8,
+}
+BRIEFS = [
+    FULL_BRIEF,
+    # Every field empty: the fixed lines and the default negative prompt remain.
+    {name: "" for name in INPUT_NAMES} | {"duration_seconds": 4},
+    # A custom goal wins over the dropdown; whitespace is trimmed on both sides.
+    FULL_BRIEF | {"custom_goal": "  Boost trial sign-ups  ", "negative_prompt": " blurry "},
+    # Only the second persona field, a missing brand and a float slider value.
+    {name: None for name in INPUT_NAMES}
+    | {"persona_details": "Busy parents", "campaign_goal": "Lead generation", "duration_seconds": 6.0},
+]
+
+RUNNER = """
+const chunks = [];
+process.stdin.on("data", (chunk) => chunks.push(chunk));
+process.stdin.on("end", () => {
+    const { source, briefs } = JSON.parse(chunks.join(""));
+    const craft = eval(source);
+    console.log(JSON.stringify(briefs.map((args) => craft(...args))));
+});
+"""
+
+
+def python_version(brief: dict) -> list:
+    """What step15's craft_brief returns for the brief."""
+    negative = (brief["negative_prompt"] or "").strip() or DEFAULT_NEGATIVE
+    return [render_prompt({name: brief[name] for name in INPUT_NAMES if name != "negative_prompt"}), negative]
+
+
+@unittest.skipUnless(shutil.which("node"), "node is not installed")
+class CraftPromptParityTest(unittest.TestCase):
+    def test_browser_matches_python(self) -> None:
+        payload = {
+            "source": craft_js(INPUT_NAMES, DEFAULT_NEGATIVE),
+            "briefs": [[brief[name] for name in INPUT_NAMES] for brief in BRIEFS],
+        }
+        result = subprocess.run(
+            ["node", "-e", RUNNER],
+            input=json.dumps(payload),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for brief, browser in zip(BRIEFS, json.loads(result.stdout)):
+            with self.subTest(brief=brief):
+                self.assertEqual(browser, python_version(brief))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Spans opened inside a generator handler stay in the handler's trace.
+
+Gradio runs each step of a sync generator handler with
+`anyio.to_thread.run_sync`, in a fresh copy of the context. The test drives
+a traced generator the same way. Skipped when `anyio` (installed with
+Gradio) is missing.
+
+    uv run python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+from pathlib import Path
+
+os.environ["TRACE_FILE"] = "off"
+os.environ["REQUEST_LOG"] = "off"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import tracing  # noqa: E402
+
+try:
+    import anyio
+    import anyio.to_thread
+except ImportError:
+    anyio = None
+
+
+_NO_ITEM = object()
+
+
+@tracing.traced("test.stream")
+def stream_steps():
+    for step in range(3):
+        with tracing.span("test.child", step=step):
+            pass
+        yield step
+
+
+@unittest.skipUnless(anyio, "anyio is not installed")
+class GeneratorHandlerTraceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.finished = []
+        tracing.add_listener(self.finished.append)
+        self.addCleanup(tracing._listeners.remove, self.finished.append)
+
+    def test_children_after_yield_share_the_handler_trace(self) -> None:
+        async def drive() -> list:
+            iterator = stream_steps()
+            items = []
+            while True:
+                item = await anyio.to_thread.run_sync(next, iterator, _NO_ITEM)
+                if item is _NO_ITEM:
+                    return items
+                items.append(item)
+
+        self.assertEqual(anyio.run(drive), [0, 1, 2])
+        handler = next(span for span in self.finished if span.name == "test.stream")
+        children = [span for span in self.finished if span.name == "test.child"]
+        self.assertEqual(len(children), 3)
+        for child in children:
+            with self.subTest(step=child.attributes["step"]):
+                self.assertEqual(child.trace_id, handler.trace_id)
+                self.assertEqual(child.parent_id, handler.span_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+"""Lightweight request tracing for the Gemini calls in every demo.
+
+Each traced operation becomes a span: a name, start and end times, a parent
+(so nested work lines up), attributes such as the model, and an error status
+if it failed. Finished spans are appended as one JSON object per line to
+TRACE_FILE (default `.cache/traces.jsonl`). The field names follow the
+OpenTelemetry (OTLP) JSON span format, so the file can be converted or
+loaded into OTLP-aware tools. Set TRACE_FILE=off to disable tracing.
+
+    with tracing.span("veo.download", model=VIDEO_MODEL):
+        video_bytes = client.files.download(file=generated.video)
+
+Streams are wrapped with `trace_stream`, which records the time to the first
+chunk and the gaps between chunks. Event handlers are decorated with
+`@tracing.traced("step13.generate_video")` so the calls they make appear as
+child spans of one request; the same name switches on profiling for that
+handler (see `profiling.py`) and names its entries in the request log
+(see `request_log.py`). The beginner steps have no tracing code; `server.py`
+traces their handlers with `trace_handlers`.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, TypeVar
+
+import profiling
+import request_log
+
+
+T = TypeVar("T")
+
+TRACE_FILE = os.getenv("TRACE_FILE", str(Path(".cache") / "traces.jsonl"))
+ENABLED = TRACE_FILE.lower() not in {"", "0", "off", "false"}
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+_write_lock = threading.Lock()
+_listeners: list[Callable[["Span"], None]] = []
+
+
+class Span:
+    """One timed operation with attributes."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.parent_span = parent
+        self.attributes = dict(attributes)
+        self.events: list[Dict[str, Any]] = []
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Attach or overwrite an attribute."""
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float) -> None:
+        """Add to a numeric attribute, starting from zero."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def event(self, name: str, **attributes: Any) -> None:
+        """Record a point in time inside the span."""
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes})
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _export(self)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+
+def add_listener(listener: Callable[[Span], None]) -> None:
+    """Call `listener` with every finished span, even when file export is off."""
+    _listeners.append(listener)
+
+
+def _export(finished: Span) -> None:
+    for listener in _listeners:
+        listener(finished)
+    if not ENABLED:
+        return
+    line = json.dumps(finished.to_json(), default=str)
+    with _write_lock:
+        path = Path(TRACE_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+def current() -> Optional[Span]:
+    """Return the innermost open span in this thread or task, if any."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as a child of the current span."""
+    opened = Span(name, _current.get(), attributes)
+    token = _current.set(opened)
+    try:
+        yield opened
+    except BaseException as exc:
+        opened.error = f"{type(exc).__name__}: {exc}"
+        status = getattr(exc, "code", None)
+        if status is not None:
+            opened.set("error.code", status)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A generator handler's span is closed in the context of its last step.
+            _current.set(opened.parent_span)
+        opened.end()
+
+
+def trace_stream(chunks: Iterable[T], name: str, **attributes: Any) -> Iterator[T]:
+    """Yield from `chunks` while recording time to first chunk and chunk gaps."""
+    opened = Span(name, _current.get(), attributes)
+    started = time.perf_counter()
+    previous = first = started
+    largest_gap = 0.0
+    count = 0
+    try:
+        for chunk in chunks:
+            now = time.perf_counter()
+            if count == 0:
+                first = now
+                opened.set("time_to_first_chunk_ms", round((now - started) * 1000, 3))
+            else:
+                largest_gap = max(largest_gap, now - previous)
+            previous = now
+            count += 1
+            yield chunk
+    except BaseException as exc:
+        if not isinstance(exc, GeneratorExit):
+            opened.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        opened.set("chunks", count)
+        if count > 1:
+            opened.set("mean_chunk_gap_ms", round((previous - first) * 1000 / (count - 1), 3))
+            opened.set("max_chunk_gap_ms", round(largest_gap * 1000, 3))
+        opened.end()
+
+
+def traced(name: str, uploads: Sequence[str] = ()) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a handler so each call, including generator handlers, is one span.
+
+    Each call is also written to the request log (see `request_log.py`), and
+    calls selected by the profiling settings are profiled. `uploads` names the
+    parameters that receive file paths from upload components, so the log
+    describes them as files.
+    """
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.isgeneratorfunction(fn):
+
+            @functools.wraps(fn)
+            def generator_wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+                with (
+                    request_log.logged(name, fn, args, kwargs, uploads) as entry,
+                    span(name, kind="handler") as handler,
+                ):
+                    profile = profiling.start(name)
+                    running = profile.running if profile else nullcontext
+                    iterator = fn(*args, **kwargs)
+                    try:
+                        while True:
+                            # Gradio resumes the generator in a fresh copy of the context,
+                            # so the handler span is made current again for every step.
+                            token = _current.set(handler)
+                            # Only profile while the handler runs, not while Gradio sends updates.
+                            try:
+                                with running():
+                                    item = next(iterator)
+                            except StopIteration:
+                                return
+                            finally:
+                                _current.reset(token)
+                            entry.update(item)
+                            yield item
+                    finally:
+                        iterator.close()
+                        if profile:
+                            profile.finish()
+
+            generator_wrapper.traced_name = name  # type: ignore[attr-defined]
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with request_log.logged(name, fn, args, kwargs, uploads) as entry, span(name, kind="handler"):
+                profile = profiling.start(name)
+                try:
+                    with profile.running() if profile else nullcontext():
+                        entry.output = fn(*args, **kwargs)
+                        return entry.output
+                finally:
+                    if profile:
+                        profile.finish()
+
+        wrapper.traced_name = name  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorate
+
+
+def trace_handlers(demo: Any, prefix: str) -> None:
+    """Trace every named handler of a `gr.Blocks` app that is not traced yet.
+
+    `server.py` calls this for each demo, so the beginner steps log and trace
+    their calls without any tracing code of their own. Handlers are named
+    `<prefix>.<function name>`; inputs from upload components are logged as
+    files.
+    """
+    import gradio as gr
+
+    upload_components = (gr.File, gr.UploadButton, gr.Video, gr.Audio)
+    for block_fn in demo.fns.values():
+        fn = block_fn.fn
+        if not inspect.isfunction(fn) or hasattr(fn, "traced_name") or fn.__name__.startswith("<"):
+            continue
+        # Gradio passes the input components' values positionally.
+        parameters = list(inspect.signature(fn).parameters)
+        uploads = [
+            parameter
+            for parameter, component in zip(parameters, block_fn.inputs)
+            if isinstance(component, upload_components)
+            or (isinstance(component, gr.Image) and component.type == "filepath")
+        ]
+        block_fn.fn = traced(f"{prefix}.{fn.__name__}", uploads)(fn)
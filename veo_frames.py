@@ -0,0 +1,91 @@
+"""Prepare reference frames for Veo.
+
+Veo renders 720p or 1080p video at 16:9 or 9:16, so a full-resolution upload
+is center-cropped to the video's aspect ratio and scaled down to its frame
+size before it is sent, then encoded as JPEG. That is a fraction of the CPU
+time and payload of a lossless PNG of the original.
+
+Prepared frames are kept in a small in-memory LRU keyed by the image content
+and the target size, so rendering again with a new seed or prompt reuses them.
+"""
+
+import contextvars
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from google.genai import types
+from PIL import Image
+
+import tracing
+
+
+FRAME_SIZES = {
+    ("16:9", "720p"): (1280, 720),
+    ("9:16", "720p"): (720, 1280),
+    ("16:9", "1080p"): (1920, 1080),
+    ("9:16", "1080p"): (1080, 1920),
+}
+JPEG_QUALITY = 92
+CACHE_ITEMS = 32
+
+_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def frame_size(aspect_ratio: str, resolution: str) -> Tuple[int, int]:
+    """Return the (width, height) Veo renders for this aspect ratio and resolution."""
+    return FRAME_SIZES.get((aspect_ratio, resolution), FRAME_SIZES[("16:9", "720p")])
+
+
+def _center_crop(image: Image.Image, width: int, height: int) -> Image.Image:
+    """Crop the largest centered region with the target's aspect ratio."""
+    source_width, source_height = image.size
+    if source_width * height > source_height * width:
+        crop_width, crop_height = round(source_height * width / height), source_height
+    else:
+        crop_width, crop_height = source_width, round(source_width * height / width)
+    left = (source_width - crop_width) // 2
+    top = (source_height - crop_height) // 2
+    return image.crop((left, top, left + crop_width, top + crop_height))
+
+
+def prepare_frame(image: Image.Image, aspect_ratio: str = "16:9", resolution: str = "720p") -> types.Image:
+    """Crop, downscale and JPEG-encode `image` for a Veo render of the given shape."""
+    width, height = frame_size(aspect_ratio, resolution)
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+    key = (digest, image.size, image.mode, width, height)
+    with _lock:
+        encoded = _cache.get(key)
+        if encoded is not None:
+            _cache.move_to_end(key)
+            return types.Image(image_bytes=encoded, mime_type="image/jpeg")
+
+    with tracing.span("veo.prepare_frame", source_size=f"{image.width}x{image.height}") as traced:
+        frame = _center_crop(image, width, height)
+        if frame.width > width:
+            # Only ever scale down; Veo upsamples small frames itself.
+            frame = frame.resize((width, height), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        frame.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY)
+        encoded = buffer.getvalue()
+        traced.set("bytes", len(encoded))
+
+    with _lock:
+        _cache[key] = encoded
+        while len(_cache) > CACHE_ITEMS:
+            _cache.popitem(last=False)
+    return types.Image(image_bytes=encoded, mime_type="image/jpeg")
+
+
+def prepare_frames(images: List[Image.Image], aspect_ratio: str, resolution: str) -> List[types.Image]:
+    """Prepare several frames at once; PIL releases the GIL while resizing and encoding."""
+    with ThreadPoolExecutor(max_workers=max(1, len(images))) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, prepare_frame, image, aspect_ratio, resolution)
+            for image in images
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,140 @@
+"""Small MP4 helpers for the video steps.
+
+`faststart` moves the `moov` index of an MP4 in front of the media data,
+the layout ffmpeg writes with `-movflags +faststart`. Browsers can then
+start playback after the first few kilobytes instead of the whole file.
+Only the container is rewritten (chunk offsets are patched), never the
+encoded video, and it needs no ffmpeg.
+
+`concat_videos` joins clips into one MP4 with ffmpeg's concat demuxer and
+stream copy, so nothing is re-encoded. That only works when every clip has
+the same codecs and frame size, which holds for segments rendered by the
+same Veo model and settings. ffmpeg is optional: without it, or when the
+clips do not match, it returns None and callers offer the separate clips
+instead.
+"""
+
+import hashlib
+import json
+import shutil
+import struct
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import tracing
+from media_store import OUTPUT_DIR
+
+
+# Boxes on the path from `moov` down to the chunk offset tables.
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int, int]]:
+    """Yield (type, box start, payload start, box end) for each box in data[start:end]."""
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise ValueError("Truncated MP4 box.")
+        yield kind, offset, offset + header, offset + size
+        offset += size
+
+
+def _shift_chunk_offsets(moov: bytearray, delta: int, start: int = 0, end: Optional[int] = None) -> None:
+    """Add `delta` to every entry of the stco/co64 tables inside `moov`, in place."""
+    for kind, _, payload, box_end in list(_boxes(moov, start, len(moov) if end is None else end)):
+        if kind in CONTAINER_BOXES:
+            _shift_chunk_offsets(moov, delta, payload, box_end)
+        elif kind in (b"stco", b"co64"):
+            width, code, limit = (4, ">I", 0xFFFFFFFF) if kind == b"stco" else (8, ">Q", 2**64 - 1)
+            (count,) = struct.unpack_from(">I", moov, payload + 4)
+            for index in range(count):
+                position = payload + 8 + index * width
+                value = struct.unpack_from(code, moov, position)[0] + delta
+                if value > limit:
+                    raise OverflowError("Chunk offset does not fit after moving moov.")
+                struct.pack_into(code, moov, position, value)
+
+
+def faststart(data: bytes) -> bytes:
+    """Return the MP4 with `moov` before `mdat`; other files come back unchanged."""
+    try:
+        top = list(_boxes(data, 0, len(data)))
+    except (ValueError, struct.error):
+        return data
+    kinds = [box[0] for box in top]
+    if b"moov" not in kinds or b"mdat" not in kinds:
+        return data
+    moov_index = kinds.index(b"moov")
+    if any(kind == b"mdat" for kind in kinds[moov_index:]):
+        # Already faststart (or media on both sides of moov, which we leave alone).
+        return data
+
+    _, moov_start, _, moov_end = top[moov_index]
+    mdat_start = top[kinds.index(b"mdat")][1]
+    moov = bytearray(data[moov_start:moov_end])
+    try:
+        # Everything from the first mdat up to the old moov moves back by the size of moov.
+        _shift_chunk_offsets(moov, len(moov))
+    except (OverflowError, ValueError, struct.error):
+        return data
+    return b"".join([data[:mdat_start], bytes(moov), data[mdat_start:moov_start], data[moov_end:]])
+
+
+def _stream_signature(path: str) -> Optional[list]:
+    """Return codec, size and frame rate of each stream, or None if ffprobe fails."""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-show_entries",
+            "stream=codec_type,codec_name,width,height,r_frame_rate,sample_rate,channels",
+            "-of", "json", path,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout).get("streams", [])
+
+
+def concat_videos(paths: List[str]) -> Optional[Path]:
+    """Join MP4 clips in order without re-encoding; return None if that is not possible."""
+    if not paths or not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        return None
+    signatures = [_stream_signature(path) for path in paths]
+    if signatures[0] is None or any(signature != signatures[0] for signature in signatures):
+        return None
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    output = OUTPUT_DIR / f"storyboard-{digest.hexdigest()[:24]}.mp4"
+    if output.exists():
+        return output
+
+    with tempfile.TemporaryDirectory() as folder, tracing.span("ffmpeg.concat", clips=len(paths)):
+        playlist = Path(folder) / "clips.txt"
+        # The concat demuxer quotes paths with single quotes, escaped as '\''.
+        lines = [Path(path).resolve().as_posix().replace("'", "'\\''") for path in paths]
+        playlist.write_text("".join(f"file '{line}'\n" for line in lines), encoding="utf-8")
+        partial = Path(folder) / output.name
+        result = subprocess.run(
+            [
+                "ffmpeg", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", str(playlist),
+                "-c", "copy", "-movflags", "+faststart", str(partial),
+            ],
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            return None
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(partial), output)
+    return output